@@ -1,42 +1,74 @@
 import openpyxl
 import csv
-from itertools import zip_longest
+import functools
+import os
+from itertools import accumulate
+
+# Optional: python-calamine (pip install python-calamine) is a Rust-based reader
+# that returns plain cell values many times faster than openpyxl. openpyxl is
+# used when it isn't installed.
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+CSV_BUFFER_SIZE = 1024 * 1024
+
+CONFIG_HEADERS = frozenset({
+    'nodename', 'protocol', 'ip_address', 'login_id',
+    'login_password', 'additional_command_1', 'additional_command_2'
+})
+
+def _parse_node_rows(rows):
+    """
+    Builds the node dicts from header-first rows of stripped strings: column 0
+    is the header and every further cell belongs to a node. Config headers set
+    a key; any other row is a command, and a node's commands stop at its first
+    blank cell. Nodes without a nodename are dropped.
+    Shared by the CSV and Excel parsers.
+    """
+    columns = []
+    commands_ended = []
+    seen_config_headers = []
+    seen_command_row = False
+
+    for row in rows:
+        header = row[0] if row else ""
+        values = row[1:]
+
+        # A node column that first appears on a later row has blank
+        # cells for every row before it.
+        while len(columns) < len(values):
+            columns.append({"commands": [], **{h: "" for h in seen_config_headers}})
+            commands_ended.append(seen_command_row)
+        if len(values) < len(columns):
+            values = values + [""] * (len(columns) - len(values))
+
+        # The header decides the kind of the whole row, so branch once per row;
+        # the per-cell work is then just a zip over the row's values.
+        if header in CONFIG_HEADERS:
+            for node_info, value in zip(columns, values):
+                node_info[header] = value
+            seen_config_headers.append(header)
+        else:
+            for i, value in enumerate(values):
+                if not value:
+                    commands_ended[i] = True
+                elif not commands_ended[i]:
+                    columns[i]["commands"].append(value)
+            seen_command_row = True
+
+    return [node_info for node_info in columns if node_info.get('nodename')]
 
 def parse_nodes_from_csv(file_path):
     nodes = []
-    config_headers = {
-        'nodename', 'protocol', 'ip_address', 'login_id', 
-        'login_password', 'additional_command_1', 'additional_command_2'
-    }
 
     try:
-        with open(file_path, 'r', newline='', encoding='utf-8-sig') as csvfile:
-            reader = list(csv.reader(csvfile))
-            if not reader:
-                return []
-            
-            transposed_data = list(zip_longest(*reader, fillvalue=''))
-            headers = [h.strip() for h in transposed_data[0]]
-
-            for i in range(1, len(transposed_data)):
-                node_info = {"commands": []}
-                node_column = transposed_data[i]
-                commands_ended = False
-
-                for j, header in enumerate(headers):
-                    value = node_column[j].strip() if j < len(node_column) else ""
-
-                    if header not in config_headers:
-                        if not value:
-                            commands_ended = True
-                        
-                        if not commands_ended:
-                            node_info["commands"].append(value)
-                    else:
-                        node_info[header] = value
-                
-                if node_info.get('nodename'):
-                    nodes.append(node_info)
+        with open(file_path, 'r', newline='', encoding='utf-8-sig', buffering=CSV_BUFFER_SIZE) as csvfile:
+            # Stream the rows straight into the parser instead of materialising
+            # and transposing the file.
+            reader = csv.reader(csvfile)
+            nodes = _parse_node_rows([cell.strip() for cell in row] for row in reader)
 
     except FileNotFoundError:
         print(f"Error: The file {file_path} was not found.")
@@ -46,16 +78,44 @@ def parse_nodes_from_csv(file_path):
         return None
     return nodes
 
-def parse_nodes_from_excel(file_path, sheet_name=1):
-    nodes = []
-    config_headers = {
-        'nodename', 'protocol', 'ip_address', 'login_id',
-        'login_password', 'additional_command_1', 'additional_command_2'
-    }
+def _cell_text(value):
+    if value is None:
+        return ""
+    # calamine reports every number as a float; show whole numbers the way
+    # openpyxl does (e.g. a numeric login_id 1234, not 1234.0).
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def _read_sheet_rows(file_path, sheet_name):
+    """
+    Returns the values of one sheet as a tuple of rows, using calamine when it
+    is available and openpyxl otherwise. sheet_name is a 1-based index or a name.
+    Repeat reads of an unchanged file are served from a small cache.
+    """
+    stat = os.stat(file_path)
+    return _load_sheet_rows(os.path.abspath(file_path), sheet_name, stat.st_mtime_ns, stat.st_size)
+
+# Keyed on the file's mtime and size as well, so an edited workbook is read again.
+# The values are cached rather than the workbook itself: a read-only openpyxl
+# workbook keeps the .xlsx open until closed, which would lock it on Windows.
+@functools.lru_cache(maxsize=4)
+def _load_sheet_rows(file_path, sheet_name, mtime_ns, size):
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_path(file_path)
+        if isinstance(sheet_name, int):
+            if not 1 <= sheet_name <= len(workbook.sheet_names):
+                raise ValueError(f"Sheet index {sheet_name} is out of range.")
+            sheet = workbook.get_sheet_by_index(sheet_name - 1)
+        else:
+            sheet = workbook.get_sheet_by_name(sheet_name)
+        return tuple(map(tuple, sheet.to_python(skip_empty_area=False)))
 
+    # read_only streams the sheet XML instead of building every Cell object up front;
+    # external links and VBA are never used, so don't load them either.
+    workbook = openpyxl.load_workbook(file_path, data_only=True, read_only=True,
+                                      keep_links=False, keep_vba=False)
     try:
-        workbook = openpyxl.load_workbook(file_path, data_only=True)
-        
         if isinstance(sheet_name, int):
             if 1 <= sheet_name <= len(workbook.sheetnames):
                 sheet = workbook.worksheets[sheet_name - 1]
@@ -63,50 +123,44 @@ def parse_nodes_from_excel(file_path, sheet_name=1):
                 raise ValueError(f"Sheet index {sheet_name} is out of range.")
         else:
             sheet = workbook[sheet_name]
+        # Read-only sheets are sized by the file's <dimension> tag, which other
+        # writers often leave too large; blank columns past the real data would
+        # then be filled right into extra nodes. Size by the cells instead and
+        # pad the ragged rows back out to the widest one.
+        sheet.reset_dimensions()
+        rows = tuple(sheet.iter_rows(values_only=True))
+        width = max(map(len, rows), default=0)
+        return tuple(row + (None,) * (width - len(row)) for row in rows)
+    finally:
+        # Read-only workbooks keep the file open until closed.
+        workbook.close()
+
+def _fill_right(last_value, value):
+    # Cells are already stripped strings, so blank means empty.
+    return value or last_value
+
+def parse_nodes_from_excel(file_path, sheet_name=1):
+    nodes = []
 
-        # Read data into a 2D list (list of rows)
+    try:
+        # Read data into a 2D list (list of rows). Each cell is converted and
+        # stripped once here; the fill-right and parse passes reuse the result.
         data_by_rows = []
-        for row in sheet.iter_rows():
-            data_by_rows.append([cell.value if cell.value is not None else "" for cell in row])
+        for row in _read_sheet_rows(file_path, sheet_name):
+            data_by_rows.append([_cell_text(value) for value in row])
 
         # Corrected "Fill-Right" Logic
         for row in data_by_rows:
             # The first column (index 0) contains headers and should not be filled.
-            # We start the logic from the first data column (index 1).
-            if len(row) > 1:
-                last_value = row[1]  # Initialize with the first data point
-                for i in range(2, len(row)):
-                    if str(row[i]).strip() == "":
-                        row[i] = last_value
-                    else:
-                        last_value = row[i]
-
-        # Transpose the processed data to get columns for parsing
+            # From the first data column (index 1) on, each blank cell takes the
+            # last non-blank value to its left; accumulate carries that value along.
+            # Rows with no blank cell at all (the usual case) are left untouched.
+            if len(row) > 1 and "" in row:
+                row[1:] = accumulate(row[1:], _fill_right)
+
         if not data_by_rows or not data_by_rows[0]:
             return []
-        transposed_data = list(zip_longest(*data_by_rows, fillvalue=''))
-
-        headers = [str(h).strip() for h in transposed_data[0]]
-
-        for i in range(1, len(transposed_data)):
-            node_info = {"commands": []}
-            node_column = transposed_data[i]
-            commands_ended = False
-
-            for j, header in enumerate(headers):
-                value = str(node_column[j]).strip() if j < len(node_column) else ""
-
-                if header not in config_headers:
-                    if not value:
-                        commands_ended = True
-                    
-                    if not commands_ended:
-                        node_info["commands"].append(value)
-                else:
-                    node_info[header] = value
-            
-            if node_info.get('nodename'):
-                nodes.append(node_info)
+        nodes = _parse_node_rows(data_by_rows)
 
     except FileNotFoundError:
         print(f"Error: The file {file_path} was not found.")
@@ -1,5 +1,8 @@
 import asyncio
+import functools
 import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 import asyncssh
 
 # Custom exception for prompt timeouts
@@ -10,7 +13,337 @@ class PromptTimeoutError(Exception):
 class LogoutFailedError(Exception):
     pass
 
-PROMPT_RE = re.compile(b'\S+[>#$]\s*$')
+# Anchored at the very end of the buffer (\Z) and allowed to skip trailing
+# whitespace including newlines, so one search over the raw bytes tells whether
+# the last non-empty line ends in a prompt; no splitting into lines needed.
+PROMPT_RE = re.compile(rb'\S[>#$]\s*\Z')
+# Telnet login prompts, matched case-insensitively on the raw bytes.
+LOGIN_PROMPT_RE = re.compile(rb'username:|login:', re.IGNORECASE)
+PASSWORD_PROMPT_RE = re.compile(rb'password:', re.IGNORECASE)
+# Longest prompt text minus one: how far back a search has to start so a
+# prompt split across two reads is still found.
+LOGIN_PROMPT_OVERLAP = len(b'username:') - 1
+PASSWORD_PROMPT_OVERLAP = len(b'password:') - 1
+# Total wait for the login prompt, Telnet option negotiation included.
+LOGIN_PROMPT_TIMEOUT = 5.0
+# Total wait for the password prompt after sending the username.
+PASSWORD_PROMPT_TIMEOUT = 15.0
+# Large reads pull a whole burst of output (e.g. show tech) per await.
+READ_CHUNK_SIZE = 65536
+# Log files are written through a large buffer instead of being flushed after
+# every write; in cycle mode the buffer is flushed once per cycle.
+LOG_WRITE_BUFFER_SIZE = 1024 * 1024
+# Shared by all nodes for every log file call (open, write, flush, close), so
+# disk I/O never runs on the event loop.
+FILE_IO_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='log-io')
+# Most SSH servers cap concurrent sessions per connection (OpenSSH: MaxSessions 10),
+# so a shared connection carries at most this many node channels at once.
+SSH_MAX_CHANNELS = 8
+# Pooled connections outlive single nodes (a whole run_cycle run), so keep them
+# alive through idle NAT/firewall timeouts and notice dead peers.
+SSH_KEEPALIVE_INTERVAL = 30
+# Telnet receive buffer: starts at this size and grows when output arrives
+# faster than it is read; reading is paused past the high-water mark.
+TELNET_RECV_BUFFER_SIZE = 256 * 1024
+TELNET_RECV_HIGH_WATER = 1024 * 1024
+
+class SSHConnectionPool:
+    """
+    Shares asyncssh connections between nodes on the same device, keyed by
+    (ip_address, login_id, login_password): the first node connects and logs in,
+    later nodes only open their own channel on that connection. When a connection
+    already carries SSH_MAX_CHANNELS nodes another one is opened for the same key.
+    """
+
+    def __init__(self):
+        self._conns = {}
+        self._locks = {}
+
+    @asynccontextmanager
+    async def session(self, node_info):
+        key = (node_info['ip_address'], node_info['login_id'], node_info['login_password'])
+        # One lock per key: the first node connects, the rest wait and reuse it.
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            # Drop connections the server or a dead keepalive has closed,
+            # e.g. between cycles, so the next node reconnects.
+            entries = [e for e in self._conns.get(key, []) if not e[0].is_closed()]
+            self._conns[key] = entries
+            entry = next((e for e in entries if e[1] < SSH_MAX_CHANNELS), None)
+            if entry is None:
+                conn = await asyncssh.connect(
+                    node_info['ip_address'],
+                    username=node_info['login_id'],
+                    password=node_info['login_password'],
+                    known_hosts=None,
+                    keepalive_interval=SSH_KEEPALIVE_INTERVAL
+                )
+                entry = [conn, 0]
+                entries.append(entry)
+            entry[1] += 1
+        try:
+            yield entry[0]
+        finally:
+            entry[1] -= 1
+
+    async def close(self):
+        for entries in self._conns.values():
+            for conn, _ in entries:
+                conn.close()
+                await conn.wait_closed()
+        self._conns.clear()
+
+# Line endings sent after each command.
+CRLF = b'\r\n'
+LF = b'\n'
+
+# Both logout commands are sent in a single write. If 'exit' already ends the
+# session the 'logout' line is simply never read; if it only leaves a mode,
+# 'logout' follows without first waiting out a full timeout for 'exit'.
+LOGOUT_COMMANDS = ('exit', 'logout')
+LOGOUT_TELNET = b''.join(command.encode('ascii') + CRLF for command in LOGOUT_COMMANDS)
+LOGOUT_SSH = b''.join(command.encode('ascii') + LF for command in LOGOUT_COMMANDS)
+LOGOUT_LOG_LINE = f"--- Attempting logout with {' / '.join(repr(c) for c in LOGOUT_COMMANDS)} ---\n"
+# Total wait for the server to close the session after the logout commands;
+# same as the old per-command loops (5 reads of 3 seconds each).
+LOGOUT_TIMEOUT = 5 * 3.0 * len(LOGOUT_COMMANDS)
+
+IAC, DONT, DO, WONT, WILL = b'\xff', b'\xfe', b'\xfd', b'\xfc', b'\xfb'
+# Refuse every option: answer WILL with DONT and DO with WONT.
+NEGOTIATION_REPLIES = {WILL: DONT, DO: WONT}
+
+def _split_telnet_negotiation(data, clean):
+    """
+    Splits one Telnet read: appends the data with every 3-byte IAC sequence
+    removed to the clean bytearray, and returns the refusals to send back for
+    them. find() jumps straight from one IAC to the next, so plain text is
+    copied in slices rather than byte by byte, straight into the caller's buffer.
+    """
+    view = memoryview(data)
+    response = bytearray()
+    pos = 0
+    while True:
+        i = data.find(IAC, pos)
+        if i < 0:
+            clean += view[pos:]
+            break
+        clean += view[pos:i]
+        reply = NEGOTIATION_REPLIES.get(data[i+1:i+2])
+        if reply:
+            response += IAC + reply + data[i+2:i+3]
+        pos = i + 3
+    return bytes(response)
+
+async def _read_until_match(reader, pattern, overlap):
+    """
+    Reads until pattern is found in the received bytes (NULs removed) and
+    returns True, or False if the connection closes first. Each search only
+    covers the new bytes plus overlap. The caller bounds the total wait.
+    """
+    buffer = bytearray()
+    while True:
+        chunk = await reader.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return False
+        search_from = max(0, len(buffer) - overlap)
+        buffer += chunk.replace(b'\x00', b'')
+        if pattern.search(buffer, search_from):
+            return True
+
+class LogWriter:
+    """
+    A node's log file. write() only appends the text to a pending list; one
+    drainer task per node joins everything pending into a single write on
+    FILE_IO_POOL, so neither the writes nor the flushes they trigger block the
+    event loop for the other nodes.
+    Use as `async with LogWriter(path) as log_file:`.
+    """
+
+    def __init__(self, log_file_path):
+        self._path = log_file_path
+        self._pending = []
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()  # set while nothing is pending or being written
+        self._idle.set()
+        self._closing = False
+        self._file = None
+        self._drainer = None
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        self._file = await loop.run_in_executor(FILE_IO_POOL, functools.partial(
+            open, self._path, 'w', encoding='utf-8', buffering=LOG_WRITE_BUFFER_SIZE))
+        self._drainer = asyncio.create_task(self._drain())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await self._drainer
+        finally:
+            await asyncio.get_running_loop().run_in_executor(FILE_IO_POOL, self._file.close)
+
+    def write(self, text):
+        self._pending.append(text)
+        if not self._wakeup.is_set():
+            self._idle.clear()
+            self._wakeup.set()
+
+    async def flush(self):
+        """Waits until everything written so far is on disk (cycle mode, once per cycle)."""
+        idle = asyncio.ensure_future(self._idle.wait())
+        await asyncio.wait((idle, self._drainer), return_when=asyncio.FIRST_COMPLETED)
+        if self._drainer.done():
+            # The drainer only stops early when a write failed; raise that error.
+            idle.cancel()
+            self._drainer.result()
+        await asyncio.get_running_loop().run_in_executor(FILE_IO_POOL, self._file.flush)
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        pending = self._pending
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while pending:
+                batch = ''.join(pending)
+                pending.clear()
+                await loop.run_in_executor(FILE_IO_POOL, self._file.write, batch)
+            self._idle.set()
+            if self._closing:
+                return
+
+class TelnetConnection(asyncio.BufferedProtocol):
+    """
+    Telnet client connection that lets the transport recv_into() one reusable
+    bytearray, instead of the streams API's new bytes object per read plus the
+    copy into StreamReader's buffer. It offers the parts of the StreamReader /
+    StreamWriter interface used here: read(), write(), drain(), close() and
+    wait_closed(), so one object serves as both reader and writer.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._buffer = bytearray(TELNET_RECV_BUFFER_SIZE)
+        self._start = 0  # unread data is self._buffer[self._start:self._end]
+        self._end = 0
+        self._transport = None
+        self._eof = False
+        self._exception = None
+        # Set by connection_lost() even on a clean close, when exc is None.
+        self._connection_lost = False
+        self._paused = False
+        self._data_waiter = None
+        self._drain_waiter = None
+        self._write_paused = False
+        self._closed = self._loop.create_future()
+
+    # --- Protocol callbacks ---
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def get_buffer(self, sizehint):
+        # Called before every receive, while no view of the buffer is held, so
+        # the buffer can be compacted or grown here (never in buffer_updated).
+        if len(self._buffer) - self._end < READ_CHUNK_SIZE:
+            unread = self._end - self._start
+            if self._start:
+                self._buffer[:unread] = self._buffer[self._start:self._end]
+                self._start, self._end = 0, unread
+            if len(self._buffer) - self._end < READ_CHUNK_SIZE:
+                self._buffer.extend(bytes(len(self._buffer)))
+        return memoryview(self._buffer)[self._end:]
+
+    def buffer_updated(self, nbytes):
+        self._end += nbytes
+        if not self._paused and self._end - self._start > TELNET_RECV_HIGH_WATER:
+            # Nobody is reading fast enough; let TCP flow control push back.
+            self._transport.pause_reading()
+            self._paused = True
+        self._wake_reader()
+
+    def eof_received(self):
+        self._eof = True
+        self._wake_reader()
+
+    def connection_lost(self, exc):
+        self._eof = True
+        self._connection_lost = True
+        self._exception = exc
+        self._wake_reader()
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+    def pause_writing(self):
+        self._write_paused = True
+
+    def resume_writing(self):
+        self._write_paused = False
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+    def _wake_reader(self):
+        if self._data_waiter is not None and not self._data_waiter.done():
+            self._data_waiter.set_result(None)
+
+    # --- StreamReader / StreamWriter subset ---
+    async def read(self, n=-1):
+        """Returns up to n bytes (all buffered bytes if n < 0), or b'' at EOF."""
+        while self._start == self._end:
+            if self._exception is not None:
+                raise self._exception
+            if self._eof:
+                return b''
+            self._data_waiter = self._loop.create_future()
+            try:
+                await self._data_waiter
+            finally:
+                self._data_waiter = None
+        end = self._end if n < 0 else min(self._end, self._start + n)
+        # One copy, straight out of the receive buffer into the returned bytes.
+        data = bytes(memoryview(self._buffer)[self._start:end])
+        self._start = end
+        if self._paused and self._end - self._start <= TELNET_RECV_HIGH_WATER // 2:
+            self._transport.resume_reading()
+            self._paused = False
+        return data
+
+    def write(self, data):
+        # A closed transport would silently drop the data.
+        if self._connection_lost:
+            raise ConnectionResetError('Connection lost')
+        self._transport.write(data)
+
+    async def drain(self):
+        if self._transport.is_closing():
+            # Same as StreamWriter: give connection_lost a chance to run first.
+            await asyncio.sleep(0)
+        if self._exception is not None:
+            raise self._exception
+        if self._connection_lost:
+            raise ConnectionResetError('Connection lost')
+        if self._write_paused and not self._transport.is_closing():
+            self._drain_waiter = self._loop.create_future()
+            try:
+                await self._drain_waiter
+            finally:
+                self._drain_waiter = None
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
+    async def wait_closed(self):
+        # Shielded so a timeout around one wait does not cancel the shared future.
+        await asyncio.shield(self._closed)
+
+async def open_telnet_connection(host, port=23):
+    """Connects to host:port and returns the TelnetConnection (reader and writer in one)."""
+    loop = asyncio.get_running_loop()
+    _, connection = await loop.create_connection(TelnetConnection, host, port)
+    return connection
 
 async def _update_status(queue, node_name, status, message=""):
     """Helper to safely put status updates on the queue."""
@@ -18,91 +351,154 @@ async def _update_status(queue, node_name, status, message=""):
         await queue.put({'node': node_name, 'status': status, 'message': message})
 
 async def read_until_prompt(stream, timeout=40):
-    full_output = b""
+    # Most outputs arrive in one read and are searched and decoded as that bytes
+    # object; longer ones move into a bytearray that grows in place, since += on
+    # bytes would copy the whole buffer per chunk.
+    full_output = b''
+    loop = asyncio.get_running_loop()
     try:
-        while True:
-            chunk = await asyncio.wait_for(stream.read(1024), timeout=timeout)
-            if not chunk:
-                break
-            full_output += chunk
-            non_empty_lines = [line for line in full_output.splitlines() if line.strip()]
-            if non_empty_lines and PROMPT_RE.search(non_empty_lines[-1]):
-                break
+        # One timeout scope for the whole wait instead of a wait_for task per read;
+        # the deadline is pushed back whenever data arrives, so it stays an idle timeout.
+        async with asyncio.timeout(timeout) as idle_timeout:
+            while True:
+                chunk = await stream.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                idle_timeout.reschedule(loop.time() + timeout)
+                # A match ending before this chunk would have been found on the previous
+                # read, so the search only has to start one byte before the new data.
+                scan_from = max(0, len(full_output) - 1)
+                if not full_output:
+                    full_output = chunk
+                else:
+                    if type(full_output) is bytes:
+                        full_output = bytearray(full_output)
+                    full_output += chunk
+                if PROMPT_RE.search(full_output, scan_from):
+                    break
     except asyncio.TimeoutError:
         raise PromptTimeoutError(f"Timeout waiting for prompt after {timeout} seconds.")
     
     return full_output.decode('utf-8', errors='ignore')
 
+async def _read_to_eof(stream):
+    """Reads and discards what the server sends until it closes the stream."""
+    while await stream.read(READ_CHUNK_SIZE):
+        pass
+
+async def _wait_for_close(closed, log_file):
+    """
+    Awaits closed, which finishes once the server has closed the session after
+    the logout commands. One deadline covers the whole wait instead of a
+    wait_for per read. Returns False if the session is still open after LOGOUT_TIMEOUT.
+    """
+    try:
+        async with asyncio.timeout(LOGOUT_TIMEOUT):
+            await closed
+    except TimeoutError:
+        log_file.write("--- Timed out waiting for connection to close. ---\n")
+        return False
+    log_file.write("--- Server closed connection. Logout successful. ---\n")
+    return True
+
+async def _run_commands(node_info, log_file, status_queue, send, stream, encoding, line_end,
+                        cycle_interval=-1, stop_event=None):
+    """
+    Sends the node's commands and logs each response; shared by Telnet and SSH,
+    which differ only in send(line_bytes), the stream read back and the encoding.
+    Runs once (cycle_interval == -1) or every cycle until stop_event is set.
+    """
+    node_name = node_info['nodename']
+    # Look up and encode every command line once; cycle mode resends them every cycle.
+    def command_line(kind, cmd):
+        return f"--- Sending {kind}: {cmd} ---\n", cmd.encode(encoding) + line_end
+
+    command_lines = [command_line('command', cmd) for cmd in node_info['commands']]
+    additional_1 = node_info.get('additional_command_1')
+    additional_2 = node_info.get('additional_command_2')
+    if additional_1:
+        additional_1 = command_line('additional_command_1', additional_1)
+    if additional_2:
+        additional_2 = command_line('additional_command_2', additional_2)
+
+    async def run_once():
+        await _update_status(status_queue, node_name, 'executing_commands')
+        if additional_1:
+            header, line = additional_1
+            log_file.write(header)
+            await send(line)
+            response = await read_until_prompt(stream)
+            log_file.write(response)
+            if additional_2 and ":" in response:
+                header, line = additional_2
+                log_file.write(header)
+                await send(line)
+                response2 = await read_until_prompt(stream)
+                log_file.write(response2)
+        for header, line in command_lines:
+            log_file.write(header)
+            await send(line)
+            response = await read_until_prompt(stream)
+            log_file.write(response)
+
+    if cycle_interval == -1:
+        # Single run mode for run_automation.py
+        await run_once()
+    else:
+        # Cycle mode for run_cycle.py
+        while not stop_event.is_set():
+            await run_once()
+            await log_file.flush()
+            await asyncio.sleep(cycle_interval / 1000)
+
 async def execute_telnet_async(node_info, log_file_path, status_queue=None, cycle_interval=-1, stop_event=None):
     node_name = node_info['nodename']
     writer = None
-    with open(log_file_path, 'w', encoding='utf-8') as log_file:
+    async with LogWriter(log_file_path) as log_file:
         try:
             await _update_status(status_queue, node_name, 'connecting')
             log_file.write(f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via Telnet ---\n")
-            log_file.flush()
             
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(node_info['ip_address'], 23),
+            connection = await asyncio.wait_for(
+                open_telnet_connection(node_info['ip_address'], 23),
                 timeout=10
             )
+            reader = writer = connection
 
             # --- Full Telnet Login Sequence ---
-            IAC, DONT, DO, WONT, WILL = b'\xff', b'\xfe', b'\xfd', b'\xfc', b'\xfb'
-            buffer = b''
-            negotiation_attempts = 0
+            # The whole login banner is collected in one growing bytearray.
+            buffer = bytearray()
+            login_prompt_found = False
             await _update_status(status_queue, node_name, 'authenticating')
-            while negotiation_attempts < 10:
-                try:
-                    data = await asyncio.wait_for(reader.read(1024), timeout=0.5)
-                    if not data:
-                        break
-                    response = b''
-                    i = 0
-                    clean_chunk = b''
-                    while i < len(data):
-                        if data[i:i+1] == IAC:
-                            command = data[i+1:i+2]
-                            option = data[i+2:i+3]
-                            if command == WILL:
-                                response += IAC + DONT + option
-                            elif command == DO:
-                                response += IAC + WONT + option
-                            i += 3
-                        else:
-                            clean_chunk += data[i:i+1]
-                            i += 1
-                    if response:
-                        writer.write(response)
-                        await writer.drain()
-                    buffer += clean_chunk
-                    if any(p in buffer.lower() for p in [b'username:', b'login:']):
-                        break
-                except asyncio.TimeoutError:
-                    break
-                finally:
-                    negotiation_attempts += 1
+            try:
+                async with asyncio.timeout(LOGIN_PROMPT_TIMEOUT):
+                    while True:
+                        data = await reader.read(READ_CHUNK_SIZE)
+                        if not data:
+                            break
+                        # Only the new bytes (plus an overlap) can hold a prompt not seen yet.
+                        search_from = max(0, len(buffer) - LOGIN_PROMPT_OVERLAP)
+                        response = _split_telnet_negotiation(data, buffer)
+                        if response:
+                            writer.write(response)
+                            await writer.drain()
+                        if LOGIN_PROMPT_RE.search(buffer, search_from):
+                            login_prompt_found = True
+                            break
+            except TimeoutError:
+                pass
 
             log_file.write(f"Received: {buffer.decode(errors='ignore')}\n")
-            log_file.flush()
-            if not any(p in buffer.lower() for p in [b'username:', b'login:']):
+            if not login_prompt_found:
                 raise asyncio.TimeoutError("Timeout waiting for username/login prompt.")
 
             writer.write(node_info['login_id'].encode('ascii') + b"\r\n")
             await writer.drain()
-            buffer = b""
-            prompt_found = False
-            for _ in range(30):
-                try:
-                    chunk = await asyncio.wait_for(reader.read(100), timeout=0.5)
-                    if not chunk:
-                        break
-                    buffer += chunk.replace(b'\x00', b'')
-                    if 'password:' in buffer.decode('utf-8', errors='ignore').lower():
-                        prompt_found = True
-                        break
-                except asyncio.TimeoutError:
-                    pass
+            try:
+                async with asyncio.timeout(PASSWORD_PROMPT_TIMEOUT):
+                    prompt_found = await _read_until_match(reader, PASSWORD_PROMPT_RE, PASSWORD_PROMPT_OVERLAP)
+            except TimeoutError:
+                prompt_found = False
             if not prompt_found:
                 raise asyncio.TimeoutError("Timeout waiting for password prompt.")
 
@@ -110,63 +506,26 @@ async def execute_telnet_async(node_info, log_file_path, status_queue=None, cycl
             await writer.drain()
             initial_output = await read_until_prompt(reader)
             log_file.write(initial_output)
-            log_file.flush()
 
             # --- Command Execution Logic ---
-            async def run_commands():
-                await _update_status(status_queue, node_name, 'executing_commands')
-                if node_info.get('additional_command_1'):
-                    cmd = node_info['additional_command_1']
-                    log_file.write(f"--- Sending additional_command_1: {cmd} ---\n")
-                    log_file.flush()
-                    writer.write(cmd.encode('ascii') + b'\r\n')
-                    await writer.drain()
-                    response = await read_until_prompt(reader)
-                    log_file.write(response)
-                    log_file.flush()
-                    if node_info.get('additional_command_2') and ":" in response:
-                        cmd2 = node_info['additional_command_2']
-                        log_file.write(f"--- Sending additional_command_2: {cmd2} ---\n")
-                        log_file.flush()
-                        writer.write(cmd2.encode('ascii') + b'\r\n')
-                        await writer.drain()
-                        response2 = await read_until_prompt(reader)
-                        log_file.write(response2)
-                        log_file.flush()
-                for cmd in node_info['commands']:
-                    log_file.write(f"--- Sending command: {cmd} ---\n")
-                    log_file.flush()
-                    writer.write(cmd.encode('ascii') + b'\r\n')
-                    await writer.drain()
-                    response = await read_until_prompt(reader)
-                    log_file.write(response)
-                    log_file.flush()
-
-            if cycle_interval == -1:
-                # Single run mode for run_automation.py
-                await run_commands()
-            else:
-                # Cycle mode for run_cycle.py
-                while not stop_event.is_set():
-                    await run_commands()
-                    await asyncio.sleep(cycle_interval / 1000)
+            async def send(line):
+                writer.write(line)
+                await writer.drain()
+
+            await _run_commands(node_info, log_file, status_queue, send, reader, 'ascii', CRLF,
+                                cycle_interval, stop_event)
 
             # --- Robust Logout Procedure ---
-            logout_commands = ['exit', 'logout']
-            for command in logout_commands:
-                log_file.write(f"--- Attempting logout with '{command}' ---\n")
-                writer.write(command.encode('ascii') + b'\r\n')
-                await writer.drain()
-                for _ in range(5):
-                    try:
-                        data = await asyncio.wait_for(reader.read(1024), timeout=3.0)
-                        if not data:
-                            log_file.write("--- Server closed connection. Logout successful. ---\n")
-                            await _update_status(status_queue, node_name, 'success')
-                            return log_file_path
-                    except asyncio.TimeoutError:
-                        log_file.write("--- Waiting for connection to close... ---\n")
-                        pass
+            log_file.write(LOGOUT_LOG_LINE)
+            writer.write(LOGOUT_TELNET)
+            await writer.drain()
+            # connection_lost() ends the wait the moment the server closes (FIN or
+            # reset) instead of reading out whatever it still sends. Closing with
+            # the unread 'logout' line still queued makes some servers reset
+            # instead of FIN; the session is gone either way.
+            if await _wait_for_close(connection.wait_closed(), log_file):
+                await _update_status(status_queue, node_name, 'success')
+                return log_file_path
             raise LogoutFailedError("Failed to disconnect from server after sending exit/logout.")
 
         except (asyncio.TimeoutError, PromptTimeoutError, LogoutFailedError):
@@ -184,77 +543,42 @@ async def execute_telnet_async(node_info, log_file_path, status_queue=None, cycl
                 except AttributeError:
                     pass
 
-async def execute_ssh_async(node_info, log_file_path, status_queue=None, cycle_interval=-1, stop_event=None):
+async def execute_ssh_async(node_info, log_file_path, status_queue=None, cycle_interval=-1, stop_event=None, connections=None):
     node_name = node_info['nodename']
-    with open(log_file_path, 'w', encoding='utf-8') as log_file:
+    async with LogWriter(log_file_path) as log_file:
         try:
             await _update_status(status_queue, node_name, 'connecting')
             log_file.write(f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via SSH ---\n")
-            log_file.flush()
             
-            async with asyncssh.connect(
-                node_info['ip_address'],
-                username=node_info['login_id'],
-                password=node_info['login_password'],
-                known_hosts=None
-            ) as conn:
+            if connections is not None:
+                # Shared with other nodes on the same device; the pool closes it.
+                connection = connections.session(node_info)
+            else:
+                connection = asyncssh.connect(
+                    node_info['ip_address'],
+                    username=node_info['login_id'],
+                    password=node_info['login_password'],
+                    known_hosts=None
+                )
+            async with connection as conn:
                 await _update_status(status_queue, node_name, 'authenticating')
                 async with conn.create_process(term_type='vt100', encoding=None) as process:
                     initial_output = await read_until_prompt(process.stdout)
                     log_file.write(initial_output)
-                    log_file.flush()
 
                     # --- Command Execution Logic ---
-                    async def run_commands():
-                        await _update_status(status_queue, node_name, 'executing_commands')
-                        if node_info.get('additional_command_1'):
-                            cmd = node_info['additional_command_1']
-                            log_file.write(f"--- Sending additional_command_1: {cmd} ---\n")
-                            log_file.flush()
-                            process.stdin.write((cmd + '\n').encode('utf-8'))
-                            response = await read_until_prompt(process.stdout)
-                            log_file.write(response)
-                            log_file.flush()
-                            if node_info.get('additional_command_2') and ":" in response:
-                                cmd2 = node_info['additional_command_2']
-                                log_file.write(f"--- Sending additional_command_2: {cmd2} ---\n")
-                                log_file.flush()
-                                process.stdin.write((cmd2 + '\n').encode('utf-8'))
-                                response2 = await read_until_prompt(process.stdout)
-                                log_file.write(response2)
-                                log_file.flush()
-                        for cmd in node_info['commands']:
-                            log_file.write(f"--- Sending command: {cmd} ---\n")
-                            log_file.flush()
-                            process.stdin.write((cmd + '\n').encode('utf-8'))
-                            response = await read_until_prompt(process.stdout)
-                            log_file.write(response)
-                            log_file.flush()
-
-                    if cycle_interval == -1:
-                        # Single run mode for run_automation.py
-                        await run_commands()
-                    else:
-                        # Cycle mode for run_cycle.py
-                        while not stop_event.is_set():
-                            await run_commands()
-                            await asyncio.sleep(cycle_interval / 1000)
+                    async def send(line):
+                        process.stdin.write(line)
+
+                    await _run_commands(node_info, log_file, status_queue, send, process.stdout, 'utf-8', LF,
+                                        cycle_interval, stop_event)
                     
                     # --- Robust Logout Procedure ---
-                    logout_commands = ['exit', 'logout']
-                    for command in logout_commands:
-                        log_file.write(f"--- Attempting logout with '{command}' ---\n")
-                        process.stdin.write((command + '\n').encode('utf-8'))
-                        for _ in range(5):
-                            try:
-                                response = await asyncio.wait_for(process.stdout.read(1024), timeout=3.0)
-                                if not response:
-                                    log_file.write("--- Server closed connection. Logout successful. ---\n")
-                                    await _update_status(status_queue, node_name, 'success')
-                                    return log_file_path
-                            except asyncio.TimeoutError:
-                                log_file.write("--- Waiting for connection to close... ---\n")
-                                pass
+                    log_file.write(LOGOUT_LOG_LINE)
+                    process.stdin.write(LOGOUT_SSH)
+                    if await _wait_for_close(_read_to_eof(process.stdout), log_file):
+                        await _update_status(status_queue, node_name, 'success')
+                        return log_file_path
                     raise LogoutFailedError("Failed to disconnect from server after sending exit/logout.")
 
         except (asyncio.TimeoutError, PromptTimeoutError, LogoutFailedError):
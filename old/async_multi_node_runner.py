@@ -1,28 +1,105 @@
 import asyncio
 import csv
+import functools
 import os
 import re
 import sys
+import tempfile
+import time
+import uuid
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
-from itertools import zip_longest
 
 # Third-party library: asyncssh. Please install it using: pip install asyncssh
+# It is imported on first use (see _import_asyncssh) so Telnet-only runs and
+# --help don't need it and don't pay for loading it.
+def _import_asyncssh():
+    try:
+        import asyncssh
+    except ImportError:
+        raise RuntimeError(
+            "The 'asyncssh' library is required for asynchronous SSH connections. "
+            "Please install it by running: pip install asyncssh"
+        ) from None
+    return asyncssh
+
+# Optional: python-isal (pip install isal) is a faster drop-in for zlib. When it is
+# available, zipfile uses it for DEFLATE and CRC32; the archive format is unchanged.
 try:
-    import asyncssh
+    from isal import isal_zlib
+    zipfile.zlib = isal_zlib
+    zipfile.crc32 = isal_zlib.crc32
 except ImportError:
-    print("Error: The 'asyncssh' library is required for asynchronous SSH connections.")
-    print("Please install it by running: pip install asyncssh")
-    exit()
+    pass
+
+# resource only exists on Unix; it's used to keep concurrency under the open-file limit.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Optional: uvloop (pip install uvloop) is a faster event loop for Linux/macOS.
+# It isn't available on Windows, where the selector loop below is used instead.
+uvloop = None
+if os.name != 'nt':
+    try:
+        import uvloop
+    except ImportError:
+        pass
+
+# Matches asyncssh's channel window; read() returns early when less is buffered.
+READ_CHUNK_SIZE = 65536
+CSV_BUFFER_SIZE = 1024 * 1024
+ZIP_COMPRESS_LEVEL = 1
+LOG_WRITE_BUFFER_SIZE = 1024 * 1024
+# A node's log moves from memory to a temporary file once it passes this many characters.
+LOG_SPILL_THRESHOLD = 1024 * 1024
+
+CONFIG_HEADERS = frozenset({
+    'nodename', 'protocol', 'ip_address', 'login_id',
+    'login_password', 'additional_command_1', 'additional_command_2',
+    'jump_host', 'pipeline', 'mode'
+})
+
+# Channels per pooled connection; same cap as network_operations.SSH_MAX_CHANNELS,
+# which isn't imported so asyncssh stays a lazy import here.
+SSH_MAX_CHANNELS = 8
+
+# Values of the optional 'pipeline' row that turn command pipelining on for a node.
+PIPELINE_ON_VALUES = frozenset({'true', 'yes', 'on', '1'})
+
+# Minimum seconds between progress bar redraws; the final 100% draw is never skipped.
+PROGRESS_REDRAW_INTERVAL = 0.1
+_last_progress_draw = 0.0
+# The last line drawn; an identical line is not written again.
+_last_progress_line = None
+
+@functools.lru_cache(maxsize=None)
+def _progress_bar_parts(fill, length):
+    return fill * length, '-' * length
 
 def print_progress_bar(iteration, total, prefix='Progress:', suffix='Complete', length=50, fill='█'):
     """
     Prints a manual, library-free progress bar to the console.
+    Redraws are rate-limited so a burst of completions doesn't flood the terminal,
+    and skipped when the line would look the same as the one already shown.
     """
+    global _last_progress_draw, _last_progress_line
+    now = time.monotonic()
+    if iteration != total and now - _last_progress_draw < PROGRESS_REDRAW_INTERVAL:
+        return
+
     percent = ("{0:.1f}").format(100 * (iteration / float(total)))
     filled_length = int(length * iteration // total)
-    bar = fill * filled_length + '-' * (length - filled_length)
-    sys.stdout.write(f'\r{prefix} |{bar}| {percent}% {suffix}')
+    filled, empty = _progress_bar_parts(fill, length)
+    line = f'\r{prefix} |{filled[:filled_length]}{empty[filled_length:]}| {percent}% {suffix}'
+    if line == _last_progress_line:
+        return
+    _last_progress_draw = now
+    _last_progress_line = line
+    sys.stdout.write(line)
     sys.stdout.flush()
     if iteration == total:
         print()
@@ -34,38 +111,44 @@ def parse_nodes_from_csv(file_path):
     Stops reading commands for a node when a blank cell is found.
     """
     nodes = []
-    config_headers = {
-        'nodename', 'protocol', 'ip_address', 'login_id', 
-        'login_password', 'additional_command_1', 'additional_command_2'
-    }
 
     try:
-        with open(file_path, 'r', newline='') as csvfile:
-            reader = list(csv.reader(csvfile))
-            if not reader:
-                return []
-            
-            transposed_data = list(zip_longest(*reader, fillvalue=''))
-            headers = [h.strip() for h in transposed_data[0]]
-
-            for i in range(1, len(transposed_data)):
-                node_info = {"commands": []}
-                node_column = transposed_data[i]
-                commands_ended = False
-
-                for j, header in enumerate(headers):
-                    value = node_column[j].strip() if j < len(node_column) else ""
-
-                    if header not in config_headers:
+        with open(file_path, 'r', newline='', encoding='utf-8-sig', buffering=CSV_BUFFER_SIZE) as csvfile:
+            # Stream the rows instead of transposing the whole file: column 0 of
+            # each row is the header and every further cell belongs to a node,
+            # so values are dispatched straight into their node dicts.
+            reader = csv.reader(csvfile)
+            commands_ended = []
+            seen_config_headers = []
+            seen_command_row = False
+
+            for row in reader:
+                header = row[0].strip() if row else ""
+                values = row[1:]
+
+                # A node column that first appears on a later row has blank
+                # cells for every row before it.
+                while len(nodes) < len(values):
+                    nodes.append({"commands": [], "command_lines": [], **{h: "" for h in seen_config_headers}})
+                    commands_ended.append(seen_command_row)
+
+                # The header decides the kind of the whole row, so branch once
+                # per row rather than once per cell.
+                if header in CONFIG_HEADERS:
+                    for i, node_info in enumerate(nodes):
+                        node_info[header] = values[i].strip() if i < len(values) else ""
+                    seen_config_headers.append(header)
+                else:
+                    for i, node_info in enumerate(nodes):
+                        value = values[i].strip() if i < len(values) else ""
                         if not value:
-                            commands_ended = True
+                            commands_ended[i] = True
                         
-                        if not commands_ended:
+                        if not commands_ended[i]:
                             node_info["commands"].append(value)
-                    else:
-                        node_info[header] = value
-                
-                nodes.append(node_info)
+                            # Encoded once here so the sessions write ready-made lines.
+                            node_info["command_lines"].append(value.encode('utf-8') + b'\n')
+                    seen_command_row = True
 
     except FileNotFoundError:
         print(f"Error: The file {file_path} was not found.")
@@ -75,345 +158,544 @@ def parse_nodes_from_csv(file_path):
         return None
     return nodes
 
-PROMPT_RE = re.compile(b'\S+[>#$]\s*
+PROMPT_RE = re.compile(rb'\S+[>#$]\s*$')
+
+async def read_until_prompt(stream, timeout=20, sentinel=None):
     """
-    Connects to a node using Telnet, waits for prompts, and executes commands.
+    Reads from a stream until a prompt is detected or a timeout occurs.
+    The stream can be an asyncio.StreamReader or an asyncssh.SSHClientProcess's stdout.
+    If sentinel (bytes) is given, prompts are ignored until the sentinel has been seen,
+    so a batch of commands can be read back with a single call.
     """
-    output_log = f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via Telnet ---\n"
-    
+    # bytearray grows in place; += on bytes would copy the whole buffer per chunk.
+    full_output = bytearray()
+    scan_from = 0
+    sentinel_from = 0
+    loop = asyncio.get_running_loop()
     try:
-        reader, writer = await asyncio.wait_for(
-            asyncio.open_connection(node_info['ip_address'], 23),
-            timeout=10
-        )
+        # Idle timeout: the deadline moves on with every chunk received.
+        async with asyncio.timeout(timeout) as idle_timeout:
+            while True:
+                chunk = await stream.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                idle_timeout.reschedule(loop.time() + timeout)
+                full_output += chunk
+                if sentinel is not None:
+                    # Same tail-scan idea: only the new bytes (plus an overlap for a
+                    # sentinel split across reads) need searching.
+                    found = full_output.find(sentinel, sentinel_from)
+                    if found < 0:
+                        sentinel_from = max(0, len(full_output) - len(sentinel) + 1)
+                        continue
+                    scan_from = found + len(sentinel)
+                    sentinel = None
+                # Only the last non-empty line can be the prompt, and it starts at or
+                # after scan_from, so there's no need to re-split the whole buffer.
+                tail = full_output[scan_from:].rstrip()
+                if tail:
+                    line_start = max(tail.rfind(b'\n'), tail.rfind(b'\r')) + 1
+                    if PROMPT_RE.search(tail, line_start):
+                        break
+                    scan_from += line_start
+    except asyncio.TimeoutError:
+        full_output += b"\n*** TIMEOUT: Waited too long for a prompt. ***\n"
+    
+    return full_output.decode('utf-8', errors='ignore')
 
-        await asyncio.wait_for(reader.readuntil(b"Username: "), timeout=5)
-        writer.write(node_info['login_id'].encode('ascii') + b"\n")
-        await writer.drain()
-        await asyncio.wait_for(reader.readuntil(b"Password: "), timeout=5)
-        writer.write(node_info['login_password'].encode('ascii') + b"\n")
-        await writer.drain()
-
-        initial_output = await read_until_prompt(reader)
-        output_log += initial_output
-        print(f"\n--- Initial connection to {node_info['nodename']} ---\n{initial_output}\n-------------------------------------")
-
-        if node_info.get('additional_command_1') and ">" in initial_output:
-            cmd = node_info['additional_command_1']
-            output_log += f"\n>>> Executing command: {cmd}\n"
-            writer.write(cmd.encode('ascii') + b'\n')
-            await writer.drain()
-            response = await read_until_prompt(reader)
-            print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
-            output_log += response
+class SpillingLog:
+    """
+    Collects a node's log. Small logs stay in memory; once a log passes
+    threshold characters it is moved to a temporary file and further text is
+    appended there, so many large concurrent captures don't all sit in RAM.
+    """
 
-        for cmd in node_info['commands']:
-            output_log += f"\n>>> Executing command: {cmd}\n"
-            writer.write(cmd.encode('ascii') + b'\n')
-            await writer.drain()
-            response = await read_until_prompt(reader)
-            print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
-            output_log += response
+    def __init__(self, threshold=LOG_SPILL_THRESHOLD):
+        self.threshold = threshold
+        self._parts = []
+        self._size = 0
+        self._file = None
 
-        writer.write(b"exit\n")
-        await writer.drain()
-        writer.close()
-        await writer.wait_closed()
-        output_log += "\n--- Disconnected ---"
+    def append(self, text):
+        if self._file is not None:
+            self._file.write(text)
+            return
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size > self.threshold:
+            self._file = tempfile.TemporaryFile('w+', encoding='utf-8', newline='')
+            self._file.writelines(self._parts)
+            self._parts = []
+
+    def chunks(self, size=READ_CHUNK_SIZE):
+        """
+        Yields the log as a sequence of strings without joining it into one.
+        """
+        if self._file is None:
+            yield from self._parts
+            return
+        self._file.flush()
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(size)
+            if not chunk:
+                break
+            yield chunk
+        self._file.seek(0, os.SEEK_END)
 
-    except Exception as e:
-        output_log += f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n"
-    
-    return node_info['nodename'], output_log
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        self._parts = []
 
 
-async def execute_ssh_async(node_info):
+def _at_user_prompt(output):
     """
-    Connects to a node using asyncssh, waits for prompts, and executes commands.
+    True if output ends at a user-mode ('>') prompt. Only the final prompt is
+    checked, so a '>' in a banner or MOTD doesn't count and long output isn't scanned.
+    """
+    return output.rstrip().endswith('>')
+
+async def execute_telnet_async(node_info, pool=None, node_timeout=None):
+    """
+    Connects to a node using Telnet, waits for prompts, and executes commands.
+    pool is accepted so every protocol handler has the same signature; Telnet
+    sessions aren't pooled.
+    The whole session is bounded by node_timeout seconds; a timeout is recorded
+    in the returned log rather than raised.
     """
-    output_log = f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via SSH ---\n"
+    node_log = SpillingLog()
+    node_log.append(f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via Telnet ---\n")
     
+    node_deadline = asyncio.timeout(node_timeout)
+    writer = None
     try:
-        async with asyncssh.connect(
-            node_info['ip_address'],
-            username=node_info['login_id'],
-            password=node_info['login_password'],
-            known_hosts=None
-        ) as conn:
-            async with conn.create_process(term_type='vt100') as process:
-                initial_output = await read_until_prompt(process.stdout)
-                output_log += initial_output
-                print(f"\n--- Initial connection to {node_info['nodename']} ---\n{initial_output}\n-------------------------------------")
-
-                if node_info.get('additional_command_1') and ">" in initial_output:
-                    cmd = node_info['additional_command_1']
-                    output_log += f"\n>>> Executing command: {cmd}\n"
-                    process.stdin.write(cmd + '\n')
-                    response = await read_until_prompt(process.stdout)
-                    print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
-                    output_log += response
-
-                for cmd in node_info['commands']:
-                    output_log += f"\n>>> Executing command: {cmd}\n"
-                    process.stdin.write(cmd + '\n')
-                    response = await read_until_prompt(process.stdout)
-                    print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
-                    output_log += response
-                
-                process.stdin.write('exit\n')
-                await process.wait()
-
-        output_log += "\n--- Disconnected ---"
+        async with node_deadline:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(node_info['ip_address'], 23),
+                timeout=10
+            )
+
+            await asyncio.wait_for(reader.readuntil(b"Username: "), timeout=5)
+            writer.write(node_info['login_id'].encode('ascii') + b"\n")
+            await writer.drain()
+            await asyncio.wait_for(reader.readuntil(b"Password: "), timeout=5)
+            writer.write(node_info['login_password'].encode('ascii') + b"\n")
+            await writer.drain()
 
-    except Exception as e:
-        output_log += f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n"
+            initial_output = await read_until_prompt(reader)
+            node_log.append(initial_output)
+            print(f"\n--- Initial connection to {node_info['nodename']} ---\n{initial_output}\n-------------------------------------")
+
+            # Past the login handshake, single command lines are far below the
+            # transport's write buffer limit, so they go out without a drain() each;
+            # the following read is what waits on the device.
+            if node_info.get('additional_command_1') and _at_user_prompt(initial_output):
+                cmd = node_info['additional_command_1']
+                node_log.append(f"\n>>> Executing command: {cmd}\n")
+                writer.write(cmd.encode('ascii') + b'\n')
+                response = await read_until_prompt(reader)
+                print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
+                node_log.append(response)
+
+            pending = zip(node_info['commands'], node_info['command_lines'])
+            if _can_pipeline(node_info):
+                await _run_pipelined(reader, writer, node_info, node_log)
+                pending = ()
+
+            for cmd, line in pending:
+                node_log.append(f"\n>>> Executing command: {cmd}\n")
+                writer.write(line)
+                response = await read_until_prompt(reader)
+                print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
+                node_log.append(response)
+
+            writer.write(b"exit\n")
+            writer.close()
+            await writer.wait_closed()
+            node_log.append("\n--- Disconnected ---")
 
-    return node_info['nodename'], output_log
+    except Exception as e:
+        if node_deadline.expired():
+            print(f"\nWarning: {node_info['nodename']} timed out after {node_timeout} seconds.")
+            node_log.append(f"\n*** TIMEOUT: {node_info['nodename']} did not finish within {node_timeout} seconds. ***\n")
+        else:
+            node_log.append(f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n")
+    finally:
+        if writer and not writer.is_closing():
+            writer.close()
+    
+    return node_info['nodename'], node_log
 
 
-def create_zip_file(files_to_zip, zip_filename):
+def _split_batched_output(output, commands, marker):
     """
-    Creates a zip archive containing the specified files.
+    Splits the output of a batched run back into one response per command, using
+    the device's echo of each command line. Returns None if any echo can't be found.
     """
-    try:
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file in files_to_zip:
-                zf.write(file, os.path.basename(file))
-        print(f"\nSuccessfully created zip file: {zip_filename}")
-    except Exception as e:
-        print(f"\nError: Failed to create zip file. Reason: {e}")
-
-
-async def main():
+    starts = []
+    pos = 0
+    for cmd in commands:
+        pos = output.find(cmd, pos)
+        if pos < 0:
+            return None
+        starts.append(pos)
+        pos += len(cmd)
+    end = output.find(marker, pos)
+    if end < 0:
+        end = len(output)
+    starts[0] = 0
+    return [output[start:stop] for start, stop in zip(starts, starts[1:] + [end])]
+
+
+def _can_pipeline(node_info):
     """
-    Main asynchronous function to orchestrate the process.
+    Pipelining is opt-in, since some CLIs misbehave on typed-ahead input: it is
+    used for plain command lists of two or more commands when the node's
+    'pipeline' row is set, e.g. to 'yes'.
     """
-    NODE_TIMEOUT = 30.0
+    return (len(node_info['commands']) > 1
+            and not node_info.get('additional_command_1')
+            and node_info.get('pipeline', '').lower() in PIPELINE_ON_VALUES)
 
-    if len(sys.argv) > 1:
-        if sys.argv[1] in ('-h', '--help'):
-            print("Usage: python async_multi_node_runner.py [path_to_your_csv_file]")
-            print(f"Default node timeout is {NODE_TIMEOUT} seconds.")
-            return
-        csv_file = sys.argv[1]
-        print(f"Using specified CSV file: {csv_file}")
-    else:
-        csv_file = 'nodes.csv'
-        print(f"No CSV file specified, defaulting to '{csv_file}'")
-
-    nodes = parse_nodes_from_csv(csv_file)
 
-    if nodes is None:
-        print("Halting script due to CSV parsing errors.")
-        return
-    if not nodes:
-        print(f"No nodes found in the CSV file '{csv_file}'. Please create it.")
+async def _run_pipelined(reader, writer, node_info, node_log):
+    """
+    Sends all of a node's commands in one write, followed by a comment line carrying
+    a unique sentinel, and waits for a single prompt after the sentinel's echo
+    instead of one round trip per command. The output is split back into
+    per-command sections so the log looks the same as a command-by-command run.
+    """
+    commands = node_info['commands']
+    marker = f"! __DONE_{uuid.uuid4().hex}__"
+    writer.write(b''.join(node_info['command_lines']) + f"{marker}\n".encode('ascii'))
+    await writer.drain()
+    batch_output = await read_until_prompt(reader, sentinel=marker.encode('ascii'))
+    responses = _split_batched_output(batch_output, commands, marker)
+    if responses is None:
+        node_log.append(f"\n>>> Executing commands: {', '.join(commands)}\n")
+        node_log.append(batch_output)
+        print(f"\n--- Output from {node_info['nodename']} ---\n{batch_output}\n-------------------------------------")
         return
+    for cmd, response in zip(commands, responses):
+        node_log.append(f"\n>>> Executing command: {cmd}\n")
+        node_log.append(response)
+        print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = f"output_{timestamp}"
-    os.makedirs(output_dir, exist_ok=True)
-    print(f"Created output directory: {output_dir}")
 
-    tasks = []
-    for node in nodes:
-        protocol = node.get('protocol', 'ssh').lower()
-        task = None
-        if protocol == 'ssh':
-            task = execute_ssh_async(node)
-        elif protocol == 'telnet':
-            task = execute_telnet_async(node)
-        else:
-            print(f"*** SKIPPING: Unknown protocol '{protocol}' for node {node['nodename']} ***")
-        
-        if task:
-            tasks.append(asyncio.wait_for(task, timeout=NODE_TIMEOUT))
-
-    total_tasks = len(tasks)
-    print(f"Processing {total_tasks} nodes with a {NODE_TIMEOUT}-second timeout per node...")
-    print_progress_bar(0, total_tasks)
+class ConnectionPool:
+    """
+    Shares asyncssh connections per (jump_host, host, username, password) so
+    nodes on the same device, or behind the same jump host, share an SSH
+    transport and each only opens its own session channel. Once a connection
+    carries SSH_MAX_CHANNELS channels another one is opened for the same key.
+    """
 
-    results = []
-    for f in asyncio.as_completed(tasks):
+    def __init__(self):
+        self._conns = {}
+        self._locks = {}
+
+    async def acquire(self, host, username, password, tunnel=None, tunnel_key=None, channels=1):
+        """
+        Returns a [connection, channels in use] entry with room for `channels`
+        more channels and reserves them; hand it back to release() when done.
+        """
+        # The password is part of the key so a node with wrong credentials never
+        # rides on a connection another node has already authenticated.
+        key = (tunnel_key, host, username, password)
+        # One lock per key: the first node connects, the rest wait and reuse it.
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            # Drop connections the device or jump host has closed, so the next
+            # node reconnects instead of failing on a dead one.
+            entries = [e for e in self._conns.get(key, []) if not e[0].is_closed()]
+            self._conns[key] = entries
+            entry = next((e for e in entries if e[1] + channels <= SSH_MAX_CHANNELS), None)
+            if entry is None:
+                conn = await _import_asyncssh().connect(
+                    host,
+                    username=username,
+                    password=password,
+                    known_hosts=None,
+                    tunnel=tunnel
+                )
+                entry = [conn, 0]
+                entries.append(entry)
+            entry[1] += channels
+            return entry
+
+    def release(self, entry, channels=1):
+        entry[1] -= channels
+
+    @asynccontextmanager
+    async def session(self, node_info, channels=1):
+        """
+        Yields the connection for a node with `channels` channels reserved on it, going
+        through its jump_host (reached with the node's own credentials) when one
+        is set. Forwarded tunnels are not sessions, so the jump host's
+        connection reserves no channel of its own.
+        """
+        tunnel = None
+        jump_host = node_info.get('jump_host')
+        if jump_host:
+            tunnel, _ = await self.acquire(jump_host, node_info['login_id'],
+                                           node_info['login_password'], channels=0)
+        entry = await self.acquire(
+            node_info['ip_address'],
+            node_info['login_id'],
+            node_info['login_password'],
+            tunnel=tunnel,
+            tunnel_key=jump_host or None,
+            channels=channels
+        )
         try:
-            result = await f
-            results.append(result)
-        except asyncio.TimeoutError:
-            print(f"\nWarning: A node task timed out after {NODE_TIMEOUT} seconds and was skipped.")
+            yield entry[0]
         finally:
-            print_progress_bar(len(results), total_tasks)
-
-    log_files = []
-    print("\nProcessing results and writing log files...")
-    for nodename, log_content in results:
-        log_filename = os.path.join(output_dir, f"{nodename}_{timestamp}.txt")
-        try:
-            with open(log_filename, 'w', encoding='utf-8') as f:
-                f.write(log_content)
-            log_files.append(log_filename)
-        except Exception as e:
-            print(f"Error writing log file for {nodename}. Reason: {e}")
-    print(f"All {len(log_files)} log files written successfully.")
-
-    if log_files:
-        zip_filename = f"command_output_{timestamp}.zip"
-        create_zip_file(log_files, zip_filename)
-    else:
-        print("No log files were generated to zip.")
-
-    print("\n=====================================================")
-    print("Script finished. All operations are complete.")
-    print("=====================================================")
+            self.release(entry, channels)
 
+    async def close(self):
+        # Close tunnelled connections before the jump hosts they run over.
+        conns = sorted(self._conns.items(), key=lambda item: item[0][0] is None)
+        for _, entries in conns:
+            for conn, _ in entries:
+                conn.close()
+                await conn.wait_closed()
+        self._conns.clear()
 
-if __name__ == "__main__":
-    if os.name == 'nt':
-        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(main()))
 
-async def read_until_prompt(stream, timeout=20):
+def _exec_channels(node_info):
     """
-    Reads from a stream until a prompt is detected or a timeout occurs.
-    The stream can be an asyncio.StreamReader or an asyncssh.SSHClientProcess's stdout.
+    Number of channels an exec-mode node reserves on its connection: one per
+    command, up to SSH_MAX_CHANNELS. Shell-mode nodes use a single channel.
     """
-    full_output = b""
-    try:
-        while True:
-            chunk = await asyncio.wait_for(stream.read(1024), timeout=timeout)
-            if not chunk:
-                break
-            full_output += chunk
-            non_empty_lines = [line for line in full_output.splitlines() if line.strip()]
-            if non_empty_lines and PROMPT_RE.search(non_empty_lines[-1]):
-                break
-    except asyncio.TimeoutError:
-        full_output += b"\n*** TIMEOUT: Waited too long for a prompt. ***\n"
-    
-    return full_output.decode('utf-8', errors='ignore')
+    if node_info.get('mode', '').lower() != 'exec':
+        return 1
+    return max(1, min(len(node_info['commands']), SSH_MAX_CHANNELS))
 
-async def execute_telnet_async(node_info):
+
+async def _run_exec(conn, node_info, node_log, channel_count):
     """
-    Connects to a node using Telnet, waits for prompts, and executes commands.
+    Runs each command on its own exec channel of the node's connection instead of
+    typing it into a shell: no pty, no prompt matching, and the commands run
+    concurrently. Used for nodes whose 'mode' row is 'exec'. Output is logged in
+    command order. At most channel_count commands, the channels the node reserved
+    on the connection, run at once.
     """
-    output_log = f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via Telnet ---\n"
-    
-    try:
-        reader, writer = await asyncio.wait_for(
-            asyncio.open_connection(node_info['ip_address'], 23),
-            timeout=10
-        )
+    channels = asyncio.Semaphore(channel_count)
 
-        await asyncio.wait_for(reader.readuntil(b"Username: "), timeout=5)
-        writer.write(node_info['login_id'].encode('ascii') + b"\n")
-        await writer.drain()
-        await asyncio.wait_for(reader.readuntil(b"Password: "), timeout=5)
-        writer.write(node_info['login_password'].encode('ascii') + b"\n")
-        await writer.drain()
-
-        initial_output = await read_until_prompt(reader)
-        output_log += initial_output
-        print(f"\n--- Initial connection to {node_info['nodename']} ---\n{initial_output}\n-------------------------------------")
-
-        if node_info.get('additional_command_1') and ">" in initial_output:
-            cmd = node_info['additional_command_1']
-            output_log += f"\n>>> Executing command: {cmd}\n"
-            writer.write(cmd.encode('ascii') + b'\n')
-            await writer.drain()
-            response = await read_until_prompt(reader)
-            print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
-            output_log += response
-
-        for cmd in node_info['commands']:
-            output_log += f"\n>>> Executing command: {cmd}\n"
-            writer.write(cmd.encode('ascii') + b'\n')
-            await writer.drain()
-            response = await read_until_prompt(reader)
-            print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
-            output_log += response
+    async def run(cmd):
+        async with channels:
+            return await conn.run(cmd, check=False)
 
-        writer.write(b"exit\n")
-        await writer.drain()
-        writer.close()
-        await writer.wait_closed()
-        output_log += "\n--- Disconnected ---"
+    commands = node_info['commands']
+    results = await asyncio.gather(*(run(cmd) for cmd in commands))
+    for cmd, result in zip(commands, results):
+        response = (result.stdout or '') + (result.stderr or '')
+        node_log.append(f"\n>>> Executing command: {cmd}\n")
+        node_log.append(response)
+        print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
 
-    except Exception as e:
-        output_log += f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n"
-    
-    return node_info['nodename'], output_log
 
-
-async def execute_ssh_async(node_info):
+async def execute_ssh_async(node_info, pool=None, node_timeout=None):
     """
     Connects to a node using asyncssh, waits for prompts, and executes commands.
+    Nodes with mode 'exec' skip the interactive shell and use _run_exec instead.
+    If a ConnectionPool is given, the SSH connection is shared with other nodes on
+    the same host or jump host and each node only opens its own session channel.
+    The whole session is bounded by node_timeout seconds; a timeout is recorded
+    in the returned log rather than raised.
     """
-    output_log = f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via SSH ---\n"
+    node_log = SpillingLog()
+    node_log.append(f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via SSH ---\n")
+    owns_pool = pool is None
+    if owns_pool:
+        pool = ConnectionPool()
     
+    node_deadline = asyncio.timeout(node_timeout)
     try:
-        async with asyncssh.connect(
-            node_info['ip_address'],
-            username=node_info['login_id'],
-            password=node_info['login_password'],
-            known_hosts=None
-        ) as conn:
-            async with conn.create_process(term_type='vt100') as process:
-                initial_output = await read_until_prompt(process.stdout)
-                output_log += initial_output
-                print(f"\n--- Initial connection to {node_info['nodename']} ---\n{initial_output}\n-------------------------------------")
-
-                if node_info.get('additional_command_1') and ">" in initial_output:
-                    cmd = node_info['additional_command_1']
-                    output_log += f"\n>>> Executing command: {cmd}\n"
-                    process.stdin.write(cmd + '\n')
-                    response = await read_until_prompt(process.stdout)
-                    print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
-                    output_log += response
-
-                for cmd in node_info['commands']:
-                    output_log += f"\n>>> Executing command: {cmd}\n"
-                    process.stdin.write(cmd + '\n')
-                    response = await read_until_prompt(process.stdout)
-                    print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
-                    output_log += response
-                
-                process.stdin.write('exit\n')
-                await process.wait()
-
-        output_log += "\n--- Disconnected ---"
+        async with node_deadline:
+            channel_count = _exec_channels(node_info)
+            async with pool.session(node_info, channel_count) as conn:
+                if node_info.get('mode', '').lower() == 'exec':
+                    await _run_exec(conn, node_info, node_log, channel_count)
+                else:
+                    async with conn.create_process(term_type='vt100', encoding=None) as process:
+                        initial_output = await read_until_prompt(process.stdout)
+                        node_log.append(initial_output)
+                        print(f"\n--- Initial connection to {node_info['nodename']} ---\n{initial_output}\n-------------------------------------")
+
+                        if node_info.get('additional_command_1') and _at_user_prompt(initial_output):
+                            cmd = node_info['additional_command_1']
+                            node_log.append(f"\n>>> Executing command: {cmd}\n")
+                            process.stdin.write((cmd + '\n').encode('utf-8'))
+                            response = await read_until_prompt(process.stdout)
+                            print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
+                            node_log.append(response)
+
+                        pending = zip(node_info['commands'], node_info['command_lines'])
+                        if _can_pipeline(node_info):
+                            await _run_pipelined(process.stdout, process.stdin, node_info, node_log)
+                            pending = ()
+
+                        for cmd, line in pending:
+                            node_log.append(f"\n>>> Executing command: {cmd}\n")
+                            process.stdin.write(line)
+                            response = await read_until_prompt(process.stdout)
+                            print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
+                            node_log.append(response)
+            
+                        process.stdin.write(b'exit\n')
+                        await process.wait()
+
+            node_log.append("\n--- Disconnected ---")
 
     except Exception as e:
-        output_log += f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n"
+        if node_deadline.expired():
+            print(f"\nWarning: {node_info['nodename']} timed out after {node_timeout} seconds.")
+            node_log.append(f"\n*** TIMEOUT: {node_info['nodename']} did not finish within {node_timeout} seconds. ***\n")
+        else:
+            node_log.append(f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n")
+    finally:
+        if owns_pool:
+            await pool.close()
+
+    return node_info['nodename'], node_log
+
+
+# Maps a node's protocol (lower-cased) to its handler. Handlers take
+# (node_info, pool=None, node_timeout=None) and return (nodename, SpillingLog).
+PROTOCOL_HANDLERS = {
+    'ssh': execute_ssh_async,
+    'telnet': execute_telnet_async,
+}
+
 
-    return node_info['nodename'], output_log
+def compress_blob(arcname, node_log, date_time):
+    """
+    Deflates one SpillingLog into a raw zip entry body, chunk by chunk. Runs on
+    a worker thread; zlib (and isal_zlib) release the GIL while compressing.
+    Returns the filled-in ZipInfo and the compressed bytes.
+    """
+    compressor = zipfile.zlib.compressobj(level=ZIP_COMPRESS_LEVEL, wbits=-15)
+    blob = bytearray()
+    crc = 0
+    file_size = 0
+    for text in node_log.chunks():
+        data = text.encode('utf-8')
+        crc = zipfile.crc32(data, crc)
+        file_size += len(data)
+        blob += compressor.compress(data)
+    blob += compressor.flush()
+
+    zinfo = zipfile.ZipInfo(arcname, date_time=date_time)
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.file_size = file_size
+    zinfo.compress_size = len(blob)
+    zinfo.CRC = crc
+    return zinfo, bytes(blob)
+
+
+def _append_compressed(zf, zinfo, blob):
+    """
+    Appends an already-deflated entry to an open ZipFile.
+    zipfile has no public API for this, so it mirrors what ZipFile.writestr
+    does after compressing: local header, data, then register for the central directory.
+    """
+    zf._writecheck(zinfo)
+    zf._didModify = True
+    zinfo.header_offset = zf.fp.tell()
+    zf.fp.write(zinfo.FileHeader())
+    zf.fp.write(blob)
+    zf.start_dir = zf.fp.tell()
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
 
 
-def create_zip_file(files_to_zip, zip_filename):
+def create_zip_file(compressed_entries, zip_filename):
     """
-    Creates a zip archive containing the specified files.
+    Creates a zip archive from logs already deflated by compress_blob.
+    compressed_entries is an iterable of (ZipInfo, bytes) pairs, written in order.
     """
     try:
         with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file in files_to_zip:
-                zf.write(file, os.path.basename(file))
+            for zinfo, blob in compressed_entries:
+                _append_compressed(zf, zinfo, blob)
         print(f"\nSuccessfully created zip file: {zip_filename}")
     except Exception as e:
         print(f"\nError: Failed to create zip file. Reason: {e}")
 
 
+def _write_log(log_filename, node_log):
+    """
+    Writes one node's SpillingLog to disk. Runs on a worker thread.
+    """
+    with open(log_filename, 'w', encoding='utf-8', newline='', buffering=LOG_WRITE_BUFFER_SIZE) as f:
+        f.writelines(node_log.chunks())
+
+
+async def _bounded(sem, coro, progress_queue, finish):
+    """
+    Runs a node coroutine once a concurrency slot is free. The node's own
+    timeout only starts once the coroutine begins, i.e. after the slot is
+    acquired. Completion is posted to progress_queue, then the log is handed
+    to finish() outside the slot so its work overlaps with nodes still running.
+    Returns (nodename, finish_result); the log itself isn't kept.
+    """
+    async with sem:
+        nodename, node_log = await coro
+    progress_queue.put_nowait(nodename)
+    return nodename, await finish(nodename, node_log)
+
+
+def _max_concurrency(requested):
+    """
+    Caps the number of nodes run at once so their sockets (plus a spill file
+    each) stay within the process's open-file limit.
+    """
+    if resource is None:
+        return requested
+    soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit == resource.RLIM_INFINITY:
+        return requested
+    # Keep some descriptors back for stdio, the zip file and worker threads.
+    fd_cap = max(1, (soft_limit - 64) // 2)
+    if requested > fd_cap:
+        print(f"Warning: limiting concurrency to {fd_cap} (open file limit is {soft_limit}).")
+        return fd_cap
+    return requested
+
+
+async def _report_progress(progress_queue, total_tasks):
+    """
+    Redraws the progress bar each time a node finishes.
+    """
+    completed = 0
+    print_progress_bar(completed, total_tasks)
+    while completed < total_tasks:
+        await progress_queue.get()
+        completed += 1
+        print_progress_bar(completed, total_tasks)
+
+
 async def main():
     """
     Main asynchronous function to orchestrate the process.
     """
     NODE_TIMEOUT = 30.0
+    # Override with the SHOWTIME_MAX_PAR environment variable.
+    CONCURRENCY = _max_concurrency(int(os.environ.get('SHOWTIME_MAX_PAR', 32)))
+
+    args = [arg for arg in sys.argv[1:] if arg != '--extract']
+    extract_logs = len(args) != len(sys.argv) - 1
 
-    if len(sys.argv) > 1:
-        if sys.argv[1] in ('-h', '--help'):
-            print("Usage: python async_multi_node_runner.py [path_to_your_csv_file]")
+    if args:
+        if args[0] in ('-h', '--help'):
+            print("Usage: python async_multi_node_runner.py [path_to_your_csv_file] [--extract]")
             print(f"Default node timeout is {NODE_TIMEOUT} seconds.")
+            print("Logs are written straight into the zip; --extract also saves them as .txt files.")
+            print("Rows named jump_host, pipeline (yes to send all commands at once) and mode")
+            print("(exec to run commands on exec channels) are node settings, not commands.")
             return
-        csv_file = sys.argv[1]
+        csv_file = args[0]
         print(f"Using specified CSV file: {csv_file}")
     else:
         csv_file = 'nodes.csv'
@@ -428,56 +710,88 @@ async def main():
         print(f"No nodes found in the CSV file '{csv_file}'. Please create it.")
         return
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = f"output_{timestamp}"
-    os.makedirs(output_dir, exist_ok=True)
-    print(f"Created output directory: {output_dir}")
+    started = datetime.now()
+    timestamp = started.strftime("%Y%m%d_%H%M%S")
+    # Every zip entry gets the same timestamp so the listing doesn't depend on
+    # the order nodes finish in.
+    zip_date_time = started.timetuple()[:6]
+
+    # Limit how many nodes are connected at once so large CSVs don't open
+    # hundreds of simultaneous handshakes.
+    sem = asyncio.Semaphore(CONCURRENCY)
+    # Nodes that share a host (or jump host) and login_id reuse one SSH connection.
+    pool = ConnectionPool()
 
-    tasks = []
+    node_coros = []
+    skipped = []
     for node in nodes:
         protocol = node.get('protocol', 'ssh').lower()
-        task = None
-        if protocol == 'ssh':
-            task = execute_ssh_async(node)
-        elif protocol == 'telnet':
-            task = execute_telnet_async(node)
-        else:
-            print(f"*** SKIPPING: Unknown protocol '{protocol}' for node {node['nodename']} ***")
-        
-        if task:
-            tasks.append(asyncio.wait_for(task, timeout=NODE_TIMEOUT))
+        handler = PROTOCOL_HANDLERS.get(protocol)
+        if handler is None:
+            skipped.append(f"{node['nodename']} ('{protocol}')")
+            continue
+        node_coros.append(handler(node, pool, node_timeout=NODE_TIMEOUT))
 
-    total_tasks = len(tasks)
-    print(f"Processing {total_tasks} nodes with a {NODE_TIMEOUT}-second timeout per node...")
-    print_progress_bar(0, total_tasks)
+    if skipped:
+        print(f"*** SKIPPING {len(skipped)} node(s) with an unknown protocol: {', '.join(skipped)} ***")
 
-    results = []
-    for f in asyncio.as_completed(tasks):
+    if any(node.get('protocol', 'ssh').lower() == 'ssh' for node in nodes):
         try:
-            result = await f
-            results.append(result)
-        except asyncio.TimeoutError:
-            print(f"\nWarning: A node task timed out after {NODE_TIMEOUT} seconds and was skipped.")
-        finally:
-            print_progress_bar(len(results), total_tasks)
+            _import_asyncssh()
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            for coro in node_coros:
+                coro.close()
+            return
 
-    log_files = []
-    print("\nProcessing results and writing log files...")
-    for nodename, log_content in results:
-        log_filename = os.path.join(output_dir, f"{nodename}_{timestamp}.txt")
+    total_tasks = len(node_coros)
+    if not total_tasks:
+        print("No nodes with a supported protocol to process.")
+        return
+    print(f"Processing {total_tasks} nodes ({CONCURRENCY} at a time) with a {NODE_TIMEOUT}-second timeout per node...")
+
+    output_dir = f"output_{timestamp}"
+    if extract_logs:
+        os.makedirs(output_dir, exist_ok=True)
+        print(f"Writing log files to {output_dir}")
+
+    # Logs are compressed (and, with --extract, written out) on worker threads as
+    # soon as each node finishes, so that work overlaps with the network work
+    # instead of following it.
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+    async def finish(nodename, node_log):
+        arcname = f"{nodename}_{timestamp}.txt"
         try:
-            with open(log_filename, 'w', encoding='utf-8') as f:
-                f.write(log_content)
-            log_files.append(log_filename)
-        except Exception as e:
-            print(f"Error writing log file for {nodename}. Reason: {e}")
-    print(f"All {len(log_files)} log files written successfully.")
-
-    if log_files:
+            # A spilled log is one temporary file, so compress and write it in turn.
+            compressed = await loop.run_in_executor(executor, compress_blob, arcname, node_log, zip_date_time)
+            if extract_logs:
+                try:
+                    await asyncio.to_thread(_write_log, os.path.join(output_dir, arcname), node_log)
+                except Exception as e:
+                    print(f"\nError writing log file {arcname}. Reason: {e}")
+        finally:
+            node_log.close()
+        return compressed
+
+    # Each node handles its own timeout and always returns (nodename, log),
+    # so the group only cancels siblings on a genuinely unexpected failure.
+    progress_queue = asyncio.Queue()
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(_report_progress(progress_queue, total_tasks))
+            tasks = [tg.create_task(_bounded(sem, coro, progress_queue, finish)) for coro in node_coros]
+    finally:
+        await pool.close()
+        executor.shutdown()
+    results = [task.result() for task in tasks]
+
+    if results:
         zip_filename = f"command_output_{timestamp}.zip"
-        create_zip_file(log_files, zip_filename)
+        create_zip_file([compressed for _, compressed in results], zip_filename)
     else:
-        print("No log files were generated to zip.")
+        print("No logs were generated to zip.")
 
     print("\n=====================================================")
     print("Script finished. All operations are complete.")
@@ -487,6 +801,8 @@ async def main():
 if __name__ == "__main__":
     if os.name == 'nt':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(main())
\ No newline at end of file
+
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
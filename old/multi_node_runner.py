@@ -1,9 +1,14 @@
 import csv
 import os
+import re
+import socket
 import telnetlib
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-import time
+from itertools import repeat
 
 # Third-party library: paramiko. Please install it using: pip install paramiko
 try:
@@ -13,37 +18,89 @@ except ImportError:
     print("Please install it by running: pip install paramiko")
     exit()
 
+# A prompt character ending the last non-blank line of the buffer.
+PROMPT_RE = re.compile(rb'\S[>#$]\s*\Z')
+READ_CHUNK_SIZE = 65536
+PROMPT_TIMEOUT = 20
+TIMEOUT_MARKER = b"\n*** TIMEOUT: Waited too long for a prompt. ***\n"
+# How many nodes are worked on at once (same variable as the async runner).
+MAX_PARALLEL = int(os.environ.get('SHOWTIME_MAX_PAR', 32))
+SSH_KEEPALIVE_INTERVAL = 30
+# Sessions per pooled client, below OpenSSH's default MaxSessions of 10.
+SSH_MAX_CHANNELS = 8
+ZIP_COMPRESS_LEVEL = 1
+
+# Authenticated SSH clients kept for the whole run, keyed by
+# (ip_address, login_id, login_password), so nodes that point at the same
+# device open a new channel instead of repeating the key exchange and login.
+# Each key maps to a list of [client, channels in use].
+_ssh_pool = {}
+_ssh_pool_locks = {}
+_ssh_pool_guard = threading.Lock()
+
+def read_until_prompt(shell, timeout=PROMPT_TIMEOUT):
+    """
+    Reads from a paramiko channel until a prompt is detected or a timeout occurs,
+    so each command takes as long as the device needs rather than a fixed sleep.
+    """
+    full_output = bytearray()
+    shell.settimeout(timeout)
+    try:
+        while True:
+            chunk = shell.recv(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            # A match ending before this chunk would have been found on the previous
+            # read, so the search only has to start one byte before the new data.
+            scan_from = max(0, len(full_output) - 1)
+            full_output += chunk
+            if PROMPT_RE.search(full_output, scan_from):
+                break
+    except socket.timeout:
+        full_output += TIMEOUT_MARKER
+    return full_output.decode('utf-8', errors='ignore')
+
+def telnet_read_until_prompt(tn, timeout=PROMPT_TIMEOUT):
+    """
+    Telnet counterpart of read_until_prompt, built on telnetlib's expect().
+    """
+    index, _, data = tn.expect([PROMPT_RE], timeout=timeout)
+    if index < 0:
+        data += TIMEOUT_MARKER
+    return data.decode('utf-8', errors='ignore')
+
 def parse_nodes_from_csv(file_path):
     """
     Parses the CSV file where each column represents a node.
-    It transposes the data so we can work with it more easily.
+    Rows are read one at a time and each cell is added to its node's dict.
     """
     nodes = []
     try:
         with open(file_path, 'r', newline='') as csvfile:
-            reader = list(csv.reader(csvfile))
-            if not reader:
-                return []
+            # Stream the rows instead of transposing the whole file: column 0 of
+            # each row is the field name and every further cell belongs to a node.
+            reader = csv.reader(csvfile)
+            first_row = True
 
-            # Transpose the data: columns become rows
-            transposed_data = list(map(list, zip(*reader)))
+            for row in reader:
+                header = row[0].strip() if row else ""
+                values = row[1:]
 
-            # First column (now first row) contains the field names
-            headers = [h.strip() for h in transposed_data[0]]
-            
-            # Process each subsequent column (now a row) as a node
-            for i in range(1, len(transposed_data)):
-                node_info = {"commands": []}
-                node_column = transposed_data[i]
-                
-                for j, header in enumerate(headers):
-                    value = node_column[j].strip() if j < len(node_column) else ""
-                    if header.startswith("command"):
+                if first_row:
+                    nodes = [{"commands": []} for _ in values]
+                    first_row = False
+                elif len(values) < len(nodes):
+                    # Like zip(*rows), the shortest row decides how many nodes there are.
+                    del nodes[len(values):]
+
+                if header.startswith("command"):
+                    for node_info, value in zip(nodes, values):
+                        value = value.strip()
                         if value: # Only add non-empty commands
                             node_info["commands"].append(value)
-                    else:
-                        node_info[header] = value
-                nodes.append(node_info)
+                else:
+                    for node_info, value in zip(nodes, values):
+                        node_info[header] = value.strip()
 
     except FileNotFoundError:
         print(f"Error: The file {file_path} was not found.")
@@ -58,7 +115,7 @@ def execute_telnet(node_info):
     """
     Connects to a node using Telnet and executes commands.
     """
-    output_log = f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via Telnet ---\n"
+    log_parts = [f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via Telnet ---\n"]
     try:
         tn = telnetlib.Telnet(node_info['ip_address'], timeout=10)
 
@@ -70,95 +127,169 @@ def execute_telnet(node_info):
         tn.read_until(b"Password: ", timeout=5)
         tn.write(node_info['login_password'].encode('ascii') + b"\n")
         
-        time.sleep(1) # Wait for login to complete
-        
         # Read initial output until we see a prompt
-        initial_output = tn.read_very_eager().decode('ascii')
-        output_log += initial_output
+        initial_output = telnet_read_until_prompt(tn)
+        log_parts.append(initial_output)
 
         # Check if the prompt is '>' for additional commands
         if ">" in initial_output:
-            output_log += f"\n>>> Prompt is '>'. Sending additional command.\n"
+            log_parts.append(f"\n>>> Prompt is '>'. Sending additional command.\n")
             tn.write(node_info['additional_command_1'].encode('ascii') + b"\n")
-            time.sleep(1)
-            output_log += tn.read_very_eager().decode('ascii')
+            log_parts.append(telnet_read_until_prompt(tn))
 
         # Execute main commands
         for cmd in node_info['commands']:
-            output_log += f"\n>>> Executing command: {cmd}\n"
+            log_parts.append(f"\n>>> Executing command: {cmd}\n")
             tn.write(cmd.encode('ascii') + b"\n")
-            time.sleep(2) # Give time for command to execute
-            output_log += tn.read_very_eager().decode('ascii')
+            log_parts.append(telnet_read_until_prompt(tn))
             
         tn.write(b"exit\n")
         tn.close()
-        output_log += "\n--- Disconnected ---"
+        log_parts.append("\n--- Disconnected ---")
         
     except Exception as e:
-        output_log += f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n"
+        log_parts.append(f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n")
         
-    return output_log
+    return ''.join(log_parts)
+
+@contextmanager
+def ssh_client(node_info):
+    """
+    Yields a connected paramiko SSHClient for the node with one channel reserved
+    on it, reusing a pooled client when the same device and credentials were
+    already logged into this run. A client carries at most SSH_MAX_CHANNELS
+    nodes at once; past that another connection is opened for the same key.
+    Connections are closed by close_ssh_pool() at the end of main().
+    """
+    key = (node_info['ip_address'], node_info['login_id'], node_info['login_password'])
+    with _ssh_pool_guard:
+        lock = _ssh_pool_locks.setdefault(key, threading.Lock())
+
+    # Only nodes sharing a key wait on each other; other devices connect in parallel.
+    with lock:
+        # Drop clients whose transport has died so the node reconnects.
+        entries = [e for e in _ssh_pool.get(key, [])
+                   if e[0].get_transport() is not None and e[0].get_transport().is_active()]
+        _ssh_pool[key] = entries
+        entry = next((e for e in entries if e[1] < SSH_MAX_CHANNELS), None)
+        if entry is None:
+            client = paramiko.SSHClient()
+            # In a real-world scenario, you should manage host keys properly.
+            # For this script, we will automatically add the key.
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+            client.connect(
+                node_info['ip_address'],
+                port=22,
+                username=node_info['login_id'],
+                password=node_info['login_password'],
+                timeout=10,
+                look_for_keys=False,
+                allow_agent=False
+            )
+            client.get_transport().set_keepalive(SSH_KEEPALIVE_INTERVAL)
+            entry = [client, 0]
+            entries.append(entry)
+        entry[1] += 1
+    try:
+        yield entry[0]
+    finally:
+        with lock:
+            entry[1] -= 1
+
+def close_ssh_pool():
+    """
+    Closes every pooled SSH connection.
+    """
+    while _ssh_pool:
+        _, entries = _ssh_pool.popitem()
+        for client, _ in entries:
+            client.close()
 
 def execute_ssh(node_info):
     """
     Connects to a node using SSH and executes commands.
     """
-    output_log = f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via SSH ---\n"
+    log_parts = [f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via SSH ---\n"]
     try:
-        client = paramiko.SSHClient()
-        # In a real-world scenario, you should manage host keys properly.
-        # For this script, we will automatically add the key.
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        client.connect(
-            node_info['ip_address'],
-            port=22,
-            username=node_info['login_id'],
-            password=node_info['login_password'],
-            timeout=10,
-            look_for_keys=False,
-            allow_agent=False
-        )
-
-        # Invoke an interactive shell
-        shell = client.invoke_shell()
-        time.sleep(1)
+        with ssh_client(node_info) as client:
+            # Invoke an interactive shell on a new channel of the (possibly shared) connection
+            shell = client.invoke_shell()
         
-        # Read the initial banner/prompt
-        initial_output = shell.recv(65535).decode('utf-8')
-        output_log += initial_output
+            # Read the initial banner/prompt
+            initial_output = read_until_prompt(shell)
+            log_parts.append(initial_output)
         
-        # Check if the prompt is '>' for additional commands
-        if ">" in initial_output:
-            output_log += f"\n>>> Prompt is '>'. Sending additional command.\n"
-            shell.send(node_info['additional_command_1'] + '\n')
-            time.sleep(2)
-            output_log += shell.recv(65535).decode('utf-8')
+            # Check if the prompt is '>' for additional commands
+            if ">" in initial_output:
+                log_parts.append(f"\n>>> Prompt is '>'. Sending additional command.\n")
+                shell.send(node_info['additional_command_1'] + '\n')
+                log_parts.append(read_until_prompt(shell))
 
-        # Execute main commands
-        for cmd in node_info['commands']:
-            output_log += f"\n>>> Executing command: {cmd}\n"
-            shell.send(cmd + '\n')
-            time.sleep(2) # Give time for command to execute
-            output_log += shell.recv(65535).decode('utf-8')
+            # Execute main commands
+            for cmd in node_info['commands']:
+                log_parts.append(f"\n>>> Executing command: {cmd}\n")
+                shell.send(cmd + '\n')
+                log_parts.append(read_until_prompt(shell))
             
-        shell.close()
-        client.close()
-        output_log += "\n--- Disconnected ---"
+            shell.close()
+        log_parts.append("\n--- Disconnected ---")
 
     except Exception as e:
-        output_log += f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n"
+        log_parts.append(f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n")
         
-    return output_log
+    return ''.join(log_parts)
 
-def create_zip_file(files_to_zip, zip_filename):
+def save_log(output_dir, nodename, log, timestamp):
     """
-    Creates a zip archive containing the specified files.
+    Writes one node's log to <output_dir>/<nodename>_<timestamp>.txt.
     """
+    log_filename = os.path.join(output_dir, f"{nodename}_{timestamp}.txt")
     try:
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file in files_to_zip:
-                zf.write(file, os.path.basename(file))
+        with open(log_filename, 'w') as f:
+            f.write(log)
+        print(f"Output for {nodename} saved to: {log_filename}")
+    except Exception as e:
+        print(f"Error writing log file for {nodename}. Reason: {e}")
+
+def run_node(node, output_dir=None, timestamp=None):
+    """
+    Runs one node with the protocol named in the CSV and returns (nodename, log).
+    If output_dir is given the log is also saved there, from this worker thread
+    as soon as the node is done, while the other nodes are still running.
+    """
+    print(f"Processing node: {node['nodename']}...")
+    protocol = node.get('protocol', 'ssh').lower() # Default to ssh if not specified
+
+    if protocol == 'ssh':
+        log = execute_ssh(node)
+    elif protocol == 'telnet':
+        log = execute_telnet(node)
+    else:
+        log = f"*** SKIPPING: Unknown protocol '{protocol}' for node {node['nodename']} ***"
+
+    if output_dir is not None:
+        save_log(output_dir, node['nodename'], log, timestamp)
+    return node['nodename'], log
+
+def run_nodes(nodes, max_parallel, output_dir=None, timestamp=None):
+    """
+    Runs all nodes concurrently and returns their (nodename, log) pairs in CSV order.
+    paramiko and telnetlib block, so each node runs in a worker thread; total time
+    is then about the slowest node rather than the sum of all of them.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(nodes)))) as pool:
+        return list(pool.map(run_node, nodes, repeat(output_dir), repeat(timestamp)))
+
+def create_zip_file(results, zip_filename, timestamp):
+    """
+    Creates a zip archive from the in-memory logs.
+    results is a list of (nodename, log) pairs; each becomes <nodename>_<timestamp>.txt.
+    """
+    try:
+        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESS_LEVEL) as zf:
+            for nodename, log in results:
+                zf.writestr(f"{nodename}_{timestamp}.txt", log)
         print(f"Successfully created zip file: {zip_filename}")
     except Exception as e:
         print(f"Error: Failed to create zip file. Reason: {e}")
@@ -184,39 +315,21 @@ def main():
         print(f"No nodes found in the CSV file '{csv_file}'. Please create it.")
         return
 
-    log_files = []
     # Create a directory to store output files
     output_dir = f"output_{timestamp}"
     os.makedirs(output_dir, exist_ok=True)
     print(f"Created output directory: {output_dir}")
 
-    for node in nodes:
-        print(f"Processing node: {node['nodename']}...")
-        log = ""
-        protocol = node.get('protocol', 'ssh').lower() # Default to ssh if not specified
-        
-        if protocol == 'ssh':
-            log = execute_ssh(node)
-        elif protocol == 'telnet':
-            log = execute_telnet(node)
-        else:
-            log = f"*** SKIPPING: Unknown protocol '{protocol}' for node {node['nodename']} ***"
-        
-        # Create individual log file for the node
-        log_filename = os.path.join(output_dir, f"{node['nodename']}_{timestamp}.txt")
-        try:
-            with open(log_filename, 'w') as f:
-                f.write(log)
-            print(f"Output for {node['nodename']} saved to: {log_filename}")
-            log_files.append(log_filename)
-        except Exception as e:
-            print(f"Error writing log file for {node['nodename']}. Reason: {e}")
+    try:
+        results = run_nodes(nodes, MAX_PARALLEL, output_dir, timestamp)
+    finally:
+        close_ssh_pool()
 
     # Create a zip file with all the individual logs
-    if log_files:
-        create_zip_file(log_files, zip_filename)
+    if results:
+        create_zip_file(results, zip_filename, timestamp)
     else:
-        print("No log files were generated to zip.")
+        print("No logs were generated to zip.")
 
     print("\n=====================================================")
     print("Script finished. All operations are complete.")
@@ -1,19 +1,40 @@
 import asyncio
+import functools
 import csv
 import os
 import re
 import sys
+import time
 import zipfile
 from datetime import datetime
-from itertools import zip_longest
 import asyncssh
 
 
+# Minimum seconds between progress bar redraws; the final 100% draw is never skipped.
+PROGRESS_REDRAW_INTERVAL = 0.1
+_last_progress_draw = 0.0
+# The last line drawn; an identical line is not written again.
+_last_progress_line = None
+
+@functools.lru_cache(maxsize=None)
+def _progress_bar_parts(fill, length):
+    return fill * length, '-' * length
+
 def print_progress_bar(iteration, total, prefix='Progress:', suffix='Complete', length=50, fill='█'):
+    global _last_progress_draw, _last_progress_line
+    now = time.monotonic()
+    if iteration != total and now - _last_progress_draw < PROGRESS_REDRAW_INTERVAL:
+        return
+
     percent = ("{0:.1f}").format(100 * (iteration / float(total)))
     filled_length = int(length * iteration // total)
-    bar = fill * filled_length + '-' * (length - filled_length)
-    sys.stdout.write(f'\r{prefix} |{bar}| {percent}% {suffix}')
+    filled, empty = _progress_bar_parts(fill, length)
+    line = f'\r{prefix} |{filled[:filled_length]}{empty[filled_length:]}| {percent}% {suffix}'
+    if line == _last_progress_line:
+        return
+    _last_progress_draw = now
+    _last_progress_line = line
+    sys.stdout.write(line)
     sys.stdout.flush()
     if iteration == total:
         print()
@@ -32,31 +53,37 @@ def parse_nodes_from_csv(file_path):
 
     try:
         with open(file_path, 'r', newline='', encoding='utf-8-sig') as csvfile:
-            reader = list(csv.reader(csvfile))
-            if not reader:
-                return []
-            
-            transposed_data = list(zip_longest(*reader, fillvalue=''))
-            headers = [h.strip() for h in transposed_data[0]]
-
-            for i in range(1, len(transposed_data)):
-                node_info = {"commands": []}
-                node_column = transposed_data[i]
-                commands_ended = False
-
-                for j, header in enumerate(headers):
-                    value = node_column[j].strip() if j < len(node_column) else ""
-
-                    if header not in config_headers:
+            # Stream the rows instead of transposing the whole file: column 0 of
+            # each row is the header and every further cell belongs to a node,
+            # so values are dispatched straight into their node dicts.
+            reader = csv.reader(csvfile)
+            commands_ended = []
+            seen_config_headers = []
+            seen_command_row = False
+
+            for row in reader:
+                header = row[0].strip() if row else ""
+                values = row[1:]
+
+                # A node column that first appears on a later row has blank
+                # cells for every row before it.
+                while len(nodes) < len(values):
+                    nodes.append({"commands": [], **{h: "" for h in seen_config_headers}})
+                    commands_ended.append(seen_command_row)
+
+                if header in config_headers:
+                    for i, node_info in enumerate(nodes):
+                        node_info[header] = values[i].strip() if i < len(values) else ""
+                    seen_config_headers.append(header)
+                else:
+                    for i, node_info in enumerate(nodes):
+                        value = values[i].strip() if i < len(values) else ""
                         if not value:
-                            commands_ended = True
-                        
-                        if not commands_ended:
+                            commands_ended[i] = True
+
+                        if not commands_ended[i]:
                             node_info["commands"].append(value)
-                    else:
-                        node_info[header] = value
-                
-                nodes.append(node_info)
+                    seen_command_row = True
 
     except FileNotFoundError:
         print(f"Error: The file {file_path} was not found.")
@@ -66,23 +93,82 @@ def parse_nodes_from_csv(file_path):
         return None
     return nodes
 
-PROMPT_RE = re.compile(b'\S+[>#:$]\s*$')
+# Anchored at the end of the buffer and allowed to skip trailing whitespace,
+# so one search over the raw bytes checks the last non-empty line.
+PROMPT_RE = re.compile(rb'\S[>#:$]\s*\Z')
+# Login prompts, matched case-insensitively on the raw bytes instead of
+# lowercasing a copy of the whole buffer for every check.
+LOGIN_PROMPT_RE = re.compile(rb'username:|login:', re.IGNORECASE)
+PASSWORD_PROMPT_RE = re.compile(rb'password:', re.IGNORECASE)
+# Large reads pull a whole burst of output (e.g. show tech) per await.
+READ_CHUNK_SIZE = 65536
+# The password prompt arrives in one small segment; one read takes the whole
+# of it instead of 100 bytes at a time.
+PASSWORD_READ_SIZE = 4096
+# Total waits for the login and password prompts, the same as the old polling
+# loops' 10 reads of 0.5 s each.
+LOGIN_PROMPT_TIMEOUT = 5.0
+PASSWORD_PROMPT_TIMEOUT = 5.0
+# Logs are written through this buffer and flushed when the file is closed,
+# not after every line.
+LOG_WRITE_BUFFER_SIZE = 65536
+ZIP_COMPRESS_LEVEL = 1
+
+IAC, DONT, DO, WONT, WILL = b'\xff', b'\xfe', b'\xfd', b'\xfc', b'\xfb'
+# Refuse every option: answer WILL with DONT and DO with WONT.
+NEGOTIATION_REPLIES = {WILL: DONT, DO: WONT}
+
+def split_telnet_negotiation(data):
+    """
+    Splits one Telnet read into (text, reply): the data with every 3-byte IAC
+    sequence removed, and the refusals to send back for them. find() jumps
+    straight from one IAC to the next, so plain text is copied in slices
+    rather than byte by byte.
+    """
+    clean = []
+    response = []
+    pos = 0
+    while True:
+        i = data.find(IAC, pos)
+        if i < 0:
+            clean.append(data[pos:])
+            break
+        clean.append(data[pos:i])
+        reply = NEGOTIATION_REPLIES.get(data[i+1:i+2])
+        if reply:
+            response.append(IAC + reply + data[i+2:i+3])
+        pos = i + 3
+    return b''.join(clean), b''.join(response)
 
 async def read_until_prompt(stream, timeout=20):
     """
     Reads from a stream until a prompt is detected or a timeout occurs.
     The stream can be an asyncio.StreamReader or an asyncssh.SSHClientProcess's stdout.
     """
-    full_output = b""
+    # Most outputs arrive in one read and are searched and decoded as that bytes
+    # object; longer ones move into a bytearray that grows in place, since += on
+    # bytes would copy the whole buffer per chunk.
+    full_output = b''
+    loop = asyncio.get_running_loop()
     try:
-        while True:
-            chunk = await asyncio.wait_for(stream.read(1024), timeout=timeout)
-            if not chunk:
-                break
-            full_output += chunk
-            non_empty_lines = [line for line in full_output.splitlines() if line.strip()]
-            if non_empty_lines and PROMPT_RE.search(non_empty_lines[-1]):
-                break
+        # Idle timeout: the deadline moves on with every chunk received.
+        async with asyncio.timeout(timeout) as idle_timeout:
+            while True:
+                chunk = await stream.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                idle_timeout.reschedule(loop.time() + timeout)
+                # A match ending before this chunk would have been found on the previous
+                # read, so the search only has to start one byte before the new data.
+                scan_from = max(0, len(full_output) - 1)
+                if not full_output:
+                    full_output = chunk
+                else:
+                    if type(full_output) is bytes:
+                        full_output = bytearray(full_output)
+                    full_output += chunk
+                if PROMPT_RE.search(full_output, scan_from):
+                    break
     except asyncio.TimeoutError:
         full_output += b"\n*** TIMEOUT: Waited too long for a prompt. ***\n"
     
@@ -91,12 +177,11 @@ async def read_until_prompt(stream, timeout=20):
 async def execute_telnet_async(node_info, log_file_path):
     """
     Connects to a node using Telnet, waits for prompts, executes commands,
-    and writes output to a log file in real-time.
+    and writes output to a buffered log file (flushed when the node is done).
     """
-    with open(log_file_path, 'w', encoding='utf-8') as log_file:
+    with open(log_file_path, 'w', encoding='utf-8', buffering=LOG_WRITE_BUFFER_SIZE) as log_file:
         try:
             log_file.write(f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via Telnet ---\n")
-            log_file.flush()
             
             reader, writer = await asyncio.wait_for(
                 asyncio.open_connection(node_info['ip_address'], 23),
@@ -104,82 +189,61 @@ async def execute_telnet_async(node_info, log_file_path):
             )
 
             # --- Basic Telnet Negotiation ---
-            IAC, DONT, DO, WONT, WILL = b'\xff', b'\xfe', b'\xfd', b'\xfc', b'\xfb'
-            buffer = b''
-            negotiation_attempts = 0
-            while negotiation_attempts < 10:
-                try:
-                    data = await asyncio.wait_for(reader.read(1024), timeout=0.5)
-                    if not data:
-                        break
-                    
-                    response = b''
-                    i = 0
-                    clean_chunk = b''
-                    while i < len(data):
-                        if data[i:i+1] == IAC:
-                            command = data[i+1:i+2]
-                            option = data[i+2:i+3]
-                            if command == WILL:
-                                response += IAC + DONT + option
-                            elif command == DO:
-                                response += IAC + WONT + option
-                            i += 3
-                        else:
-                            clean_chunk += data[i:i+1]
-                            i += 1
-                    
-                    if response:
-                        writer.write(response)
-                        await writer.drain()
-                    
-                    buffer += clean_chunk
-                    if any(p in buffer.lower() for p in [b'username:', b'login:']):
-                        break
-                except asyncio.TimeoutError:
-                    break
-                finally:
-                    negotiation_attempts += 1
+            buffer = bytearray()
+            try:
+                async with asyncio.timeout(LOGIN_PROMPT_TIMEOUT):
+                    while True:
+                        data = await reader.read(READ_CHUNK_SIZE)
+                        if not data:
+                            break
+
+                        clean_chunk, response = split_telnet_negotiation(data)
+
+                        if response:
+                            writer.write(response)
+                            await writer.drain()
+
+                        buffer += clean_chunk
+                        if LOGIN_PROMPT_RE.search(buffer):
+                            break
+            except TimeoutError:
+                pass
 
             log_file.write(f"Received: {buffer.decode(errors='ignore')}\n")
-            log_file.flush()
-            if not any(p in buffer.lower() for p in [b'username:', b'login:']):
+            if not LOGIN_PROMPT_RE.search(buffer):
                 raise asyncio.TimeoutError("Timeout waiting for username/login prompt.")
 
             log_file.write(f"--- Sending login ID: {node_info['login_id']} ---\n")
-            log_file.flush()
             writer.write(node_info['login_id'].encode('ascii') + b"\r\n")
             await writer.drain()
 
             # Password prompt detection
-            buffer = b""
+            buffer = bytearray()
             prompt_found = False
             log_file.write("--- Waiting for password prompt ---\n")
-            for _ in range(10):
-                try:
-                    chunk = await asyncio.wait_for(reader.read(100), timeout=0.5)
-                    if not chunk:
-                        raise ConnectionError("Telnet connection closed while waiting for password prompt.")
-                    buffer += chunk
-                    if b'password:' in buffer.lower():
-                        prompt_found = True
-                        break
-                except asyncio.TimeoutError:
-                    pass
+            try:
+                async with asyncio.timeout(PASSWORD_PROMPT_TIMEOUT):
+                    while True:
+                        chunk = await reader.read(PASSWORD_READ_SIZE)
+                        if not chunk:
+                            raise ConnectionError("Telnet connection closed while waiting for password prompt.")
+                        buffer += chunk
+                        if PASSWORD_PROMPT_RE.search(buffer):
+                            prompt_found = True
+                            break
+            except TimeoutError:
+                pass
 
             log_file.write(f"Received: {buffer.decode(errors='ignore')}\n")
-            log_file.flush()
             if not prompt_found:
                 raise asyncio.TimeoutError("Timeout waiting for password prompt.")
 
             log_file.write("--- Sending password ---\n")
-            log_file.flush()
             writer.write(node_info['login_password'].encode('ascii') + b"\r\n")
             await writer.drain()
 
             initial_output = await read_until_prompt(reader)
             log_file.write(initial_output)
-            log_file.flush()
             print(f"\n--- Initial connection to {node_info['nodename']} ---\n{initial_output}\n-------------------------------------")
 
             if node_info.get('additional_command_1'):
@@ -189,7 +253,6 @@ async def execute_telnet_async(node_info, log_file_path):
                 response = await read_until_prompt(reader)
                 print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
                 log_file.write(response)
-                log_file.flush()
                 
                 if node_info.get('additional_command_2') and ":" in response:
                     cmd2 = node_info['additional_command_2']
@@ -198,7 +261,6 @@ async def execute_telnet_async(node_info, log_file_path):
                     response2 = await read_until_prompt(reader)
                     print(f"\n--- Output from {node_info['nodename']} after '{cmd2}' ---\n{response2}\n-------------------------------------")
                     log_file.write(response2)
-                    log_file.flush()
 
             for cmd in node_info['commands']:
                 writer.write(cmd.encode('ascii') + b'\r\n')
@@ -206,7 +268,6 @@ async def execute_telnet_async(node_info, log_file_path):
                 response = await read_until_prompt(reader)
                 print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
                 log_file.write(response)
-                log_file.flush()
 
             writer.write(b"exit\r\n")
             await writer.drain()
@@ -216,25 +277,22 @@ async def execute_telnet_async(node_info, log_file_path):
             except AttributeError:
                 pass # For Python < 3.7 compatibility
             log_file.write("\n--- Disconnected ---")
-            log_file.flush()
             return log_file_path
 
         except Exception as e:
             error_message = f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n"
             log_file.write(error_message)
-            log_file.flush()
             return None
 
 
 async def execute_ssh_async(node_info, log_file_path):
     """
     Connects to a node using asyncssh, waits for prompts, executes commands,
-    and writes output to a log file in real-time.
+    and writes output to a buffered log file (flushed when the node is done).
     """
-    with open(log_file_path, 'w', encoding='utf-8') as log_file:
+    with open(log_file_path, 'w', encoding='utf-8', buffering=LOG_WRITE_BUFFER_SIZE) as log_file:
         try:
             log_file.write(f"--- Connecting to {node_info['nodename']} ({node_info['ip_address']}) via SSH ---\n")
-            log_file.flush()
             
             async with asyncssh.connect(
                 node_info['ip_address'],
@@ -245,7 +303,6 @@ async def execute_ssh_async(node_info, log_file_path):
                 async with conn.create_process(term_type='vt100', encoding=None) as process:
                     initial_output = await read_until_prompt(process.stdout)
                     log_file.write(initial_output)
-                    log_file.flush()
                     print(f"\n--- Initial connection to {node_info['nodename']} ---\n{initial_output}\n-------------------------------------")
 
                     if node_info.get('additional_command_1'):
@@ -254,7 +311,6 @@ async def execute_ssh_async(node_info, log_file_path):
                         response = await read_until_prompt(process.stdout)
                         print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
                         log_file.write(response)
-                        log_file.flush()
 
                         if node_info.get('additional_command_2') and ":" in response:
                             cmd2 = node_info['additional_command_2']
@@ -262,26 +318,22 @@ async def execute_ssh_async(node_info, log_file_path):
                             response2 = await read_until_prompt(process.stdout)
                             print(f"\n--- Output from {node_info['nodename']} after '{cmd2}' ---\n{response2}\n-------------------------------------")
                             log_file.write(response2)
-                            log_file.flush()
 
                     for cmd in node_info['commands']:
                         process.stdin.write((cmd + '\n').encode('utf-8'))
                         response = await read_until_prompt(process.stdout)
                         print(f"\n--- Output from {node_info['nodename']} after '{cmd}' ---\n{response}\n-------------------------------------")
                         log_file.write(response)
-                        log_file.flush()
                     
                     process.stdin.write(b'exit\n')
                     await process.wait()
 
             log_file.write("\n--- Disconnected ---")
-            log_file.flush()
             return log_file_path
 
         except Exception as e:
             error_message = f"\n*** ERROR: Failed to connect or execute commands on {node_info['nodename']}. Reason: {e} ***\n"
             log_file.write(error_message)
-            log_file.flush()
             return None
 
 def create_zip_file(files_to_zip, zip_filename):
@@ -289,7 +341,7 @@ def create_zip_file(files_to_zip, zip_filename):
     Creates a zip archive containing the specified files.
     """
     try:
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESS_LEVEL) as zf:
             for file in files_to_zip:
                 zf.write(file, os.path.basename(file))
         print(f"\nSuccessfully created zip file: {zip_filename}")
@@ -328,6 +380,10 @@ async def main():
     os.makedirs(output_dir, exist_ok=True)
     print(f"Created output directory: {output_dir}")
 
+    async def run_with_timeout(task, node_timeout):
+        async with asyncio.timeout(node_timeout):
+            return await task
+
     tasks = []
     for node in nodes:
         protocol = node.get('protocol', 'ssh').lower()
@@ -350,7 +406,7 @@ async def main():
             
             node_timeout = BASE_NODE_TIMEOUT + (num_commands * SECONDS_PER_COMMAND)
             print(f"Setting timeout for {node['nodename']} to {node_timeout} seconds ({num_commands} commands).")
-            tasks.append(asyncio.wait_for(task, timeout=node_timeout))
+            tasks.append(run_with_timeout(task, node_timeout))
 
     total_tasks = len(tasks)
     print(f"Processing {total_tasks} nodes...")
@@ -358,9 +414,13 @@ async def main():
 
     successful_log_files = []
     completed_tasks = 0
-    for f in asyncio.as_completed(tasks):
+    # Redraw the bar about 100 times over the run instead of after every node.
+    progress_step = max(1, total_tasks // 100)
+
+    async def collect(task):
+        nonlocal completed_tasks
         try:
-            log_file_path_result = await f
+            log_file_path_result = await task
             if log_file_path_result:
                 successful_log_files.append(log_file_path_result)
         except asyncio.TimeoutError:
@@ -369,7 +429,11 @@ async def main():
             print(f"\nAn error occurred in a task: {e}")
         finally:
             completed_tasks += 1
-            print_progress_bar(completed_tasks, total_tasks)
+            if completed_tasks % progress_step == 0 or completed_tasks == total_tasks:
+                print_progress_bar(completed_tasks, total_tasks)
+
+    # collect() reports each node as it finishes; gather() only waits for the last.
+    await asyncio.gather(*(collect(task) for task in tasks))
 
     print(f"\nAll {completed_tasks} node operations attempted.")
 
@@ -9,7 +9,9 @@ def validate_xlsx(file_path):
     - Reports any merged cells found in each sheet.
     """
     try:
-        workbook = openpyxl.load_workbook(file_path, data_only=True)
+        # Not read_only: merged cell ranges are only available on a full load.
+        # External links and VBA aren't reported, so skip loading them.
+        workbook = openpyxl.load_workbook(file_path, data_only=True, keep_links=False, keep_vba=False)
     except FileNotFoundError:
         print(f"Error: The file '{file_path}' was not found.")
         return
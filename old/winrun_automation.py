@@ -31,6 +31,7 @@ COLOR_RED = '\x1b[31m'
 COLOR_BLUE = '\x1b[34m'
 COLOR_RESET = '\x1b[0m'
 COLOR_FLASH = '\x1b[5m' # For flashing green
+ZIP_COMPRESS_LEVEL = 1
 
 def get_pdkey():
     kf, ma = '.pdkey', 5 * 24 * 60 * 60
@@ -130,7 +131,7 @@ class ProgressDisplay:
 
 def create_zip_file(files_to_zip, zip_filename):
     try:
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESS_LEVEL) as zf:
             for file in files_to_zip:
                 zf.write(file, os.path.basename(file))
         print(f"\nzipに固めましたよ: {zip_filename}")
@@ -192,9 +193,12 @@ async def main():
         nodes_with_timeouts.append((node['nodename'], node_timeout))
 
     display = ProgressDisplay(nodes, status_queue, nodes_with_timeouts)
+    # Looked up once per node task; a scan of the list per node was O(N^2).
+    # reversed() keeps the first entry for a repeated nodename, as the scan did.
+    timeout_by_name = dict(reversed(nodes_with_timeouts))
 
     async def run_node_task(node):
-        node_timeout = next((t for n, t in nodes_with_timeouts if n == node['nodename']), BASE_NODE_TIMEOUT)
+        node_timeout = timeout_by_name.get(node['nodename'], BASE_NODE_TIMEOUT)
         log_file_path = os.path.join(output_dir, f"{node['nodename']}_{timestamp}.txt")
         protocol = node.get('protocol', 'ssh').lower()
         task = None
@@ -207,7 +211,8 @@ async def main():
             return node['nodename'], None, f"Unknown protocol: {protocol}"
         
         try:
-            result = await asyncio.wait_for(task, timeout=node_timeout)
+            async with asyncio.timeout(node_timeout):
+                result = await task
             return node['nodename'], result, None
         except asyncio.TimeoutError:
             return node['nodename'], None, "TimeoutError"
@@ -225,12 +230,9 @@ async def main():
             await d.update()
             await asyncio.sleep(0.2) # Refresh rate
 
-    tasks = [run_node_task(node) for node in nodes]
-    updater_task = asyncio.ensure_future(display_updater(display))
-
     successful_log_files = []
-    for future in asyncio.as_completed(tasks):
-        node_name, result, error = await future
+
+    def record_result(node_name, result, error):
         display.completed_count += 1
 
         if error == "TimeoutError":
@@ -243,6 +245,13 @@ async def main():
             if result:
                 successful_log_files.append(result)
             display.node_statuses[node_name] = 'success'
+
+    async def run_and_record(node):
+        # Results are recorded as each node finishes, not in gather order.
+        record_result(*await run_node_task(node))
+
+    updater_task = asyncio.ensure_future(display_updater(display))
+    await asyncio.gather(*(run_and_record(node) for node in nodes))
     
     updater_task.cancel()
     try:
@@ -253,7 +262,7 @@ async def main():
 
     # Move cursor below the display area before printing final message
     sys.stdout.write('\n\n') 
-    print(f"全 {len(tasks)} のノードの取得が完了しました。")
+    print(f"全 {len(nodes)} のノードの取得が完了しました。")
 
     if successful_log_files:
         zip_filename = f"command_output_{timestamp}.zip"
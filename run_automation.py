@@ -2,10 +2,12 @@ import asyncio
 import os
 import sys
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
 from config_parsers import parse_nodes_from_csv, parse_nodes_from_excel
-from network_operations import execute_ssh_async, execute_telnet_async, PromptTimeoutError, LogoutFailedError
+from network_operations import execute_ssh_async, execute_telnet_async, PromptTimeoutError, LogoutFailedError, SSHConnectionPool
+from zip_utils import deflate_file, append_compressed
 
 # ANSI escape codes for cursor control
 CURSOR_UP = '\x1b[1A'
@@ -20,6 +22,9 @@ COLOR_MAGENTA = '\x1b[35m' # New color for logout failure
 COLOR_RESET = '\x1b[0m'
 COLOR_FLASH = '\x1b[5m' # For flashing green
 
+# Maximum number of nodes worked on at once; same variable as the old async runner.
+MAX_CONCURRENT_NODES = int(os.environ.get('SHOWTIME_MAX_PAR', 32))
+
 def get_pdkey():
     kf, ma = '.pdkey', 5 * 24 * 60 * 60
     if os.path.exists(kf) and time.time() - os.path.getmtime(kf) < ma:
@@ -121,9 +126,12 @@ class ProgressDisplay:
 
 def create_zip_file(files_to_zip, zip_filename):
     try:
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file in files_to_zip:
-                zf.write(file, os.path.basename(file))
+        # Files are deflated in parallel; only the writes into the zip are sequential.
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+            compressed = pool.map(deflate_file, files_to_zip)
+            with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for zinfo, blob in compressed:
+                    append_compressed(zf, zinfo, blob)
         print(f"\nzipに固めましたよ: {zip_filename}")
     except Exception as e:
         print(f"\nError: 次の理由でzip固め損ねました: {e}")
@@ -175,6 +183,8 @@ async def main():
 
     status_queue = asyncio.Queue()
     results_queue = asyncio.Queue()
+    # Nodes on the same device share one SSH connection.
+    ssh_connections = SSHConnectionPool()
     nodes_with_timeouts = []
 
     for node in nodes:
@@ -183,43 +193,49 @@ async def main():
         nodes_with_timeouts.append((node['nodename'], node_timeout))
 
     display = ProgressDisplay(nodes, status_queue, nodes_with_timeouts)
+    # Looked up once per node task; a scan of the list per node was O(N^2).
+    # reversed() keeps the first entry for a repeated nodename, as the scan did.
+    timeout_by_name = dict(reversed(nodes_with_timeouts))
+
+    # Bounds how many nodes are connected at once (sockets, log files, device load).
+    node_slots = asyncio.Semaphore(MAX_CONCURRENT_NODES)
 
     async def run_node_task(node):
-        node_timeout = next((t for n, t in nodes_with_timeouts if n == node['nodename']), BASE_NODE_TIMEOUT)
-        log_file_path = os.path.join(output_dir, f"{node['nodename']}_{timestamp}.txt")
-        protocol = node.get('protocol', 'ssh').lower()
-        task = None
-        if protocol == 'ssh':
-            task = execute_ssh_async(node, log_file_path, status_queue)
-        elif protocol == 'telnet':
-            task = execute_telnet_async(node, log_file_path, status_queue)
-        else:
-            await status_queue.put({'node': node['nodename'], 'status': 'error', 'message': f'Unknown protocol: {protocol}'})
-            return node['nodename'], None, f"Unknown protocol: {protocol}"
+        # The node's own timeout only starts once it holds a slot.
+        async with node_slots:
+            node_timeout = timeout_by_name.get(node['nodename'], BASE_NODE_TIMEOUT)
+            log_file_path = os.path.join(output_dir, f"{node['nodename']}_{timestamp}.txt")
+            protocol = node.get('protocol', 'ssh').lower()
+            task = None
+            if protocol == 'ssh':
+                task = execute_ssh_async(node, log_file_path, status_queue, connections=ssh_connections)
+            elif protocol == 'telnet':
+                task = execute_telnet_async(node, log_file_path, status_queue)
+            else:
+                await status_queue.put({'node': node['nodename'], 'status': 'error', 'message': f'Unknown protocol: {protocol}'})
+                return node['nodename'], None, f"Unknown protocol: {protocol}"
         
-        try:
-            result = await asyncio.wait_for(task, timeout=node_timeout)
-            return node['nodename'], result, None
-        except asyncio.TimeoutError:
-            return node['nodename'], None, "TimeoutError"
-        except PromptTimeoutError:
-            return node['nodename'], None, "PromptTimeoutError"
-        except LogoutFailedError:
-            return node['nodename'], None, "LogoutFailedError"
-        except Exception as e:
-            return node['nodename'], None, str(e)
+            try:
+                async with asyncio.timeout(node_timeout):
+                    result = await task
+                return node['nodename'], result, None
+            except asyncio.TimeoutError:
+                return node['nodename'], None, "TimeoutError"
+            except PromptTimeoutError:
+                return node['nodename'], None, "PromptTimeoutError"
+            except LogoutFailedError:
+                return node['nodename'], None, "LogoutFailedError"
+            except Exception as e:
+                return node['nodename'], None, str(e)
 
     async def display_updater(d):
         while d.completed_count < d.total_nodes:
             await d.update()
             await asyncio.sleep(0.2) # Refresh rate
 
-    tasks = [run_node_task(node) for node in nodes]
-    updater_task = asyncio.ensure_future(display_updater(display))
-
     successful_log_files = []
-    for future in asyncio.as_completed(tasks):
-        node_name, result, error = await future
+
+    def record_result(node_name, result, error):
         display.completed_count += 1
 
         if error == "TimeoutError":
@@ -234,7 +250,15 @@ async def main():
             if result:
                 successful_log_files.append(result)
             display.node_statuses[node_name] = 'success'
+
+    async def run_and_record(node):
+        # Results are recorded as each node finishes, not in gather order.
+        record_result(*await run_node_task(node))
+
+    updater_task = asyncio.ensure_future(display_updater(display))
+    await asyncio.gather(*(run_and_record(node) for node in nodes))
     
+    await ssh_connections.close()
     updater_task.cancel()
     try:
         await updater_task # Allow updater to finish final render
@@ -244,7 +268,7 @@ async def main():
 
     # Move cursor below the display area before printing final message
     sys.stdout.write('\n\n') 
-    print(f"全 {len(successful_log_files)}/{len(tasks)} のノードの取得が完了しました。")
+    print(f"全 {len(successful_log_files)}/{len(nodes)} のノードの取得が完了しました。")
 
     if successful_log_files:
         zip_filename = f"command_output_{timestamp}.zip"
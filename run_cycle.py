@@ -1,9 +1,11 @@
 import asyncio
 import os,sys,zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time,threading,argparse
 from config_parsers import parse_nodes_from_csv, parse_nodes_from_excel
-from network_operations import execute_ssh_async, execute_telnet_async, PromptTimeoutError, LogoutFailedError
+from network_operations import execute_ssh_async, execute_telnet_async, PromptTimeoutError, LogoutFailedError, SSHConnectionPool
+from zip_utils import deflate_file, append_compressed
 os.environ['LANG'] = 'ja_JP.UTF-8'
 # ANSI escape codes for cursor control
 CURSOR_UP = '\x1b[1A'
@@ -118,9 +120,12 @@ class ProgressDisplay:
 
 def create_zip_file(files_to_zip, zip_filename):
     try:
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file in files_to_zip:
-                zf.write(file, os.path.basename(file))
+        # Files are deflated in parallel; only the writes into the zip are sequential.
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+            compressed = pool.map(deflate_file, files_to_zip)
+            with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for zinfo, blob in compressed:
+                    append_compressed(zf, zinfo, blob)
         print(f"\nzipに固めましたよ: {zip_filename}")
     except Exception as e:
         print(f"\nError: 次の理由でzip固め損ねました: {e}")
@@ -169,6 +174,8 @@ async def main():
         os.makedirs(output_dir, exist_ok=True)
 
         status_queue = asyncio.Queue()
+        # Nodes on the same device share one SSH connection.
+        ssh_connections = SSHConnectionPool()
         nodes_with_timeouts = []
 
         for node in nodes:
@@ -185,7 +192,7 @@ async def main():
                 protocol = node.get('protocol', 'ssh').lower()
                 result = None
                 if protocol == 'ssh':
-                    result = await execute_ssh_async(node, log_file_path, status_queue)
+                    result = await execute_ssh_async(node, log_file_path, status_queue, connections=ssh_connections)
                 elif protocol == 'telnet':
                     result = await execute_telnet_async(node, log_file_path, status_queue)
                 else:
@@ -206,12 +213,9 @@ async def main():
                 await d.update()
                 await asyncio.sleep(0.2)
 
-        tasks = [run_node_task(node) for node in nodes]
-        updater_task = asyncio.ensure_future(display_updater(display))
-
         successful_log_files = []
-        for future in asyncio.as_completed(tasks):
-            node_name, result, error = await future
+
+        def record_result(node_name, result, error):
             display.completed_count += 1
             if error:
                 # Map specific errors to statuses, or use a generic 'error' status
@@ -227,12 +231,20 @@ async def main():
                 display.node_statuses[node_name] = 'success'
                 if result:
                     successful_log_files.append(result)
+
+        async def run_and_record(node):
+            # Results are recorded as each node finishes, not in gather order.
+            record_result(*await run_node_task(node))
+
+        updater_task = asyncio.ensure_future(display_updater(display))
+        await asyncio.gather(*(run_and_record(node) for node in nodes))
         
+        await ssh_connections.close()
         updater_task.cancel()
         # Ensure the final update call happens after all tasks are done and before cancellation is fully processed
         await display.update() 
         sys.stdout.write('\n\n') 
-        print(f" {len(successful_log_files)}/{len(tasks)} 台の取得が完了しました。")
+        print(f" {len(successful_log_files)}/{len(nodes)} 台の取得が完了しました。")
 
         if successful_log_files:
             zip_filename = f"command_output_{timestamp}.zip"
@@ -259,6 +271,8 @@ async def main():
         listener_thread.start()
 
         status_queue = asyncio.Queue()
+        # Nodes on the same device share one SSH connection.
+        ssh_connections = SSHConnectionPool()
         # In cycle mode, nodes_with_timeouts is not used in the same way, so passing an empty list.
         display = ProgressDisplay(nodes, status_queue, []) 
 
@@ -267,7 +281,7 @@ async def main():
             protocol = node.get('protocol', 'ssh').lower()
             # Assuming execute_ssh_async and execute_telnet_async are adapted to handle cycle mode and stop_event
             if protocol == 'ssh':
-                await execute_ssh_async(node, log_file_path, status_queue, args.interval, stop_event)
+                await execute_ssh_async(node, log_file_path, status_queue, args.interval, stop_event, connections=ssh_connections)
             elif protocol == 'telnet':
                 await execute_telnet_async(node, log_file_path, status_queue, args.interval, stop_event)
             else:
@@ -298,6 +312,7 @@ async def main():
 
         # Signal the updater to stop after all node tasks are done or an exception occurred.
         stop_event.set()
+        await ssh_connections.close()
         updater_task.cancel() # Cancel the updater task
         try:
             await updater_task # Allow updater to finish its last update if any
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import network_operations
+except ImportError as e:  # asyncssh is not installed
+    raise unittest.SkipTest(f"network_operations unavailable: {e}")
+
+
+async def _serve_one_command(reader, writer):
+    """Fake Telnet device: logs in, answers the first command, then hangs up."""
+    writer.write(b"Username: ")
+    await reader.readline()
+    writer.write(b"Password: ")
+    await reader.readline()
+    writer.write(b"\r\nrouter#")
+    await reader.readline()
+    writer.write(b"output of show ver\r\nrouter#")
+    await writer.drain()
+    writer.close()
+
+
+class TelnetPeerCloseTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = await asyncio.start_server(_serve_one_command, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.tmp = tempfile.TemporaryDirectory()
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.tmp.cleanup()
+
+    async def test_write_after_clean_close_raises(self):
+        connection = await network_operations.open_telnet_connection('127.0.0.1', self.port)
+        try:
+            while await connection.read():
+                connection.write(b"x\r\n")
+            await connection.wait_closed()
+            with self.assertRaisesRegex(ConnectionResetError, 'Connection lost'):
+                connection.write(b"show run\r\n")
+            with self.assertRaisesRegex(ConnectionResetError, 'Connection lost'):
+                await connection.drain()
+        finally:
+            connection.close()
+
+    async def test_node_fails_when_peer_closes_mid_run(self):
+        real_open = network_operations.open_telnet_connection
+        node_info = {
+            'nodename': 'r1', 'ip_address': '127.0.0.1',
+            'login_id': 'user', 'login_password': 'pass',
+            'commands': ['show ver', 'show run', 'show clock'],
+        }
+        log_path = os.path.join(self.tmp.name, 'r1.txt')
+        status_queue = asyncio.Queue()
+
+        with mock.patch.object(network_operations, 'open_telnet_connection',
+                               lambda host, port: real_open(host, self.port)):
+            result = await network_operations.execute_telnet_async(node_info, log_path, status_queue)
+
+        self.assertIsNone(result)
+        statuses = []
+        while not status_queue.empty():
+            statuses.append(status_queue.get_nowait())
+        self.assertEqual(statuses[-1]['status'], 'error')
+        self.assertIn('Connection lost', statuses[-1]['message'])
+        with open(log_path, encoding='utf-8') as f:
+            log = f.read()
+        self.assertIn('output of show ver', log)
+        self.assertNotIn('Logout successful', log)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import zip_utils
+
+
+class AppendCompressedRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        # Empty, small, and larger than one read of ZIP_READ_CHUNK_SIZE.
+        self.contents = {
+            'empty.txt': b'',
+            'small.txt': 'router#show ver\r\n出力\r\n'.encode('utf-8'),
+            'large.txt': b'interface GigabitEthernet0/1\r\n no shutdown\r\n' * 40000,
+        }
+        self.files = []
+        for name, data in self.contents.items():
+            path = os.path.join(self.tmp.name, name)
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.files.append(path)
+        self.zip_path = os.path.join(self.tmp.name, 'logs.zip')
+
+    def _write_zip(self):
+        with zipfile.ZipFile(self.zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for path in self.files:
+                zip_utils.append_compressed(zf, *zip_utils.deflate_file(path))
+
+    def _assert_round_trip(self):
+        with zipfile.ZipFile(self.zip_path) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), list(self.contents))
+            for name, data in self.contents.items():
+                self.assertEqual(zf.read(name), data)
+
+    def test_raw_append_round_trip(self):
+        with mock.patch.object(zipfile.ZipFile, 'writestr') as writestr:
+            self._write_zip()
+        writestr.assert_not_called()
+        self._assert_round_trip()
+
+    def test_writestr_fallback_round_trip(self):
+        # As if a later Python had renamed one of the private ZipFile attributes.
+        internals = zip_utils._ZIPFILE_INTERNALS + ('_renamed_internal',)
+        with mock.patch.object(zip_utils, '_ZIPFILE_INTERNALS', internals), \
+                mock.patch.object(zipfile.ZipFile, 'writestr', autospec=True,
+                                  side_effect=zipfile.ZipFile.writestr) as writestr:
+            self._write_zip()
+        self.assertEqual(writestr.call_count, len(self.files))
+        self._assert_round_trip()
+
+
+if __name__ == '__main__':
+    unittest.main()
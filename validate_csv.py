@@ -1,10 +1,8 @@
 import csv
 import sys
-from itertools import zip_longest
 
 import csv
 import sys
-from itertools import zip_longest
 
 def has_bom(file_path):
     """Checks if a file starts with the UTF-8 BOM."""
@@ -49,11 +47,14 @@ def validate_csv(file_path):
         print(f"Error: Failed to read CSV file. Reason: {e}")
         return False
 
-    # Transpose data to validate by columns (nodes)
-    transposed_data = list(zip_longest(*reader, fillvalue=''))
+    # Each row is one field and each column after the first is one node. The file
+    # is not transposed: separate passes over the rows find the widest row and
+    # collect the header column, and a final pass fills the per-node dicts.
+    # Cells missing from short rows count as empty, as before.
+    num_columns = max(len(row) for row in reader)
     
     # 2. Validate Headers
-    headers = [h.strip().lower() for h in transposed_data[0]]
+    headers = [(row[0] if row else '').strip().lower() for row in reader]
     required_headers = {'nodename', 'protocol', 'ip_address', 'login_id', 'login_password'}
     
     missing_headers = required_headers - set(headers)
@@ -64,16 +65,19 @@ def validate_csv(file_path):
         print("(OK) Headers are valid.")
 
     # 3. Validate each node column
-    if len(transposed_data) < 2:
+    if num_columns < 2:
         print("Warning: CSV file contains headers but no node data.")
         return is_valid
 
-    # Skip header column (index 0)
-    for i in range(1, len(transposed_data)):
-        node_column = transposed_data[i]
-        # Create a dictionary for the current node for easier validation
-        node_info = {headers[j]: node_column[j].strip() for j in range(len(headers)) if j < len(node_column)}
-        
+    nodes = [{} for _ in range(num_columns - 1)]
+    for header, row in zip(headers, reader):
+        cells = row[1:]
+        cells += [''] * (len(nodes) - len(cells))
+        for node_info, value in zip(nodes, cells):
+            node_info[header] = value.strip()
+
+    # Column 1 holds the headers, so node i is column i + 1
+    for i, node_info in enumerate(nodes, start=1):
         node_identifier = node_info.get('nodename') or f"Column {i+1}"
 
         # Rule: Must have a nodename
@@ -93,7 +97,7 @@ def validate_csv(file_path):
             is_valid = False
 
     if is_valid:
-        print(f"(OK) All {len(transposed_data) - 1} node entries appear to be correctly formatted.")
+        print(f"(OK) All {len(nodes)} node entries appear to be correctly formatted.")
     
     return is_valid
 
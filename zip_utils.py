@@ -0,0 +1,67 @@
+import os
+import zipfile
+from functools import partial
+
+# Command output is repetitive text, so level 1 DEFLATE gets most of level 6's
+# ratio at several times the speed. Raise it if archive size matters more.
+ZIP_COMPRESS_LEVEL = 1
+# Read size used when compressing log files into the zip
+ZIP_READ_CHUNK_SIZE = 1024 * 1024
+
+def deflate_entry(zinfo, chunks):
+    """
+    Deflates an iterable of bytes chunks into a raw zip entry body for zinfo and
+    fills in its sizes and CRC. Meant for worker threads; zlib releases the GIL
+    while compressing. Returns the ZipInfo and the compressed bytes, ready for
+    append_compressed().
+    """
+    compressor = zipfile.zlib.compressobj(level=ZIP_COMPRESS_LEVEL, wbits=-15)
+    blob = bytearray()
+    crc = 0
+    file_size = 0
+    for chunk in chunks:
+        crc = zipfile.crc32(chunk, crc)
+        file_size += len(chunk)
+        blob += compressor.compress(chunk)
+    blob += compressor.flush()
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.file_size = file_size
+    zinfo.compress_size = len(blob)
+    zinfo.CRC = crc
+    return zinfo, bytes(blob)
+
+def deflate_file(file):
+    """
+    Deflates a file on disk into an entry named after its base name.
+    """
+    zinfo = zipfile.ZipInfo.from_file(file, os.path.basename(file))
+    with open(file, 'rb') as f:
+        return deflate_entry(zinfo, iter(partial(f.read, ZIP_READ_CHUNK_SIZE), b''))
+
+# The ZipFile internals append_compressed() writes through. They are private,
+# so their presence is checked before each use.
+_ZIPFILE_INTERNALS = ('_writecheck', '_didModify', 'fp', 'start_dir', 'filelist', 'NameToInfo')
+
+def _can_append_raw(zf):
+    return (all(getattr(zf, name, None) is not None for name in _ZIPFILE_INTERNALS)
+            and hasattr(zipfile.ZipInfo, 'FileHeader'))
+
+def append_compressed(zf, zinfo, blob):
+    """
+    Appends an already-deflated entry to an open ZipFile.
+    zipfile has no public API for this, so it mirrors what ZipFile.writestr
+    does after compressing: local header, data, then register for the central directory.
+    If those internals are missing the data is inflated again and written with
+    writestr, which is slower but produces the same archive contents.
+    """
+    if not _can_append_raw(zf):
+        zf.writestr(zinfo, zipfile.zlib.decompress(blob, -15), compresslevel=ZIP_COMPRESS_LEVEL)
+        return
+    zf._writecheck(zinfo)
+    zf._didModify = True
+    zinfo.header_offset = zf.fp.tell()
+    zf.fp.write(zinfo.FileHeader())
+    zf.fp.write(blob)
+    zf.start_dir = zf.fp.tell()
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo